@@ -7,12 +7,15 @@ from redbot.core.config import Config
 from typing import Union, List
 from datetime import datetime, timedelta
 import asyncio
-import re
+import hashlib
 
 from .checklist import Checklist, ChecklistSelect
-from .helpers import get_thread, role_mention, MissingMember, IterCache, int_to_emoji, CONTAINS_PRE, CONTAINS_POST
-from .statusimage import statuses
+from .helpers import get_thread, role_mention, MissingMember, IterCache, int_to_emoji, Highlighter, highlight_term
+from .exemptions import Exemptions
+from .statusimage import statuses, StatusImageCache
 from .wufoo import WufooDB
+from .memberstate import MemberState
+from .threadindex import ThreadIndexes
 from .log import log as debug_log
 
 MENTION_EVERYONE = discord.AllowedMentions(roles=True, users=True, everyone=True)
@@ -22,30 +25,77 @@ def identifiable_name(member):
     return f"{member.display_name} ({member.name})" if member.name != member.display_name else member.name
 
 
+def attachments_hash(paths: List[str]):
+    return hashlib.sha1(repr([(p, StatusImageCache.mtime(p)) for p in paths]).encode()).hexdigest()
+
+
+def render_hash(txt: str, attachments: str):
+    return hashlib.sha1(f"{attachments}\n{txt}".encode()).hexdigest()
+
+
 class MissingDB(Exception): pass
 
+LOG_EDIT_DEBOUNCE = 2  # seconds
+LOG_LENGTH = 1800
+LOG_HEADER = "**Log:**\n"
+
+
 class Log:
-    def __init__(self, config: Config, message=None, channel=None):
+    """An application's log of events and the pinned message showing it.
+
+    Posting appends to the log in memory and leaves writing it to config to the
+    app's MemberState, so a post doesn't rewrite the whole log. Edits to an
+    existing log message are debounced so a burst of posts makes one edit"""
+    def __init__(self, config: Config, message=None, channel=None, message_id: int=None, state: MemberState=None):
         self.config = config
+        self.state = state
         self.message = message
+        self.message_id = message.id if message else message_id
         self.channel = channel
+        self.edit_task: asyncio.Task = None
 
         self.entries: list[LogEntry]
+        self.serialized: list  # entries as stored in config
+        self.length = 0  # length of the entries joined by newlines
     
     @classmethod
-    async def new(cls, config: Config, message=None, channel=None):
-        log = cls(config, message, channel)
-        log.entries = [LogEntry(content, timestamp) for timestamp, content in await config()]
+    async def new(cls, config: Config, message=None, channel=None, data: list=None, message_id: int=None, state: MemberState=None):
+        log = cls(config, message, channel, message_id, state)
+        if data is None:
+            data = await config()
+        log.entries = []
+        log.serialized = []
+        log.append([LogEntry(content, timestamp) for timestamp, content in data])
         return log
 
+    def append(self, entries: list):
+        for entry in entries:
+            self.length += len(str(entry)) + (1 if self.entries else 0)
+            self.entries.append(entry)
+            self.serialized.append(entry.serialize())
+
     def __str__(self):
-        s = "**Log:**\n" +'\n'.join(str(entry) for entry in self.entries)
-        si = 2
-        while len(s) > 1800:
-            s = f"**Log:**\n{self.entries[0]}\n-# `...`\n" + '\n'.join(str(entry) for entry in self.entries[si:])
-            si += 1
-        
-        return s
+        if len(LOG_HEADER) + self.length <= LOG_LENGTH:
+            return LOG_HEADER + '\n'.join(str(entry) for entry in self.entries)
+        # keep the first entry and as many of the latest ones as fit
+        prefix = f"{LOG_HEADER}{self.entries[0]}\n-# `...`\n"
+        budget = LOG_LENGTH - len(prefix)
+        tail = []
+        used = -1  # the first line doesn't need a newline
+        for i in range(len(self.entries) - 1, 1, -1):
+            line = str(self.entries[i])
+            if used + len(line) + 1 > budget:
+                break
+            tail.append(line)
+            used += len(line) + 1
+        return prefix + '\n'.join(reversed(tail))
+
+    async def persist(self):
+        if self.state is not None:
+            # the same list is handed over every time, so this doesn't copy anything
+            self.state.set("LOG", self.serialized)
+        else:
+            await self.config.set(self.serialized)
     
     async def post(self, content: Union[str, list] = [], timestamp: int=None, channel=None):
         if isinstance(content, str):
@@ -53,9 +103,53 @@ class Log:
         timestamp = timestamp or int(datetime.now().timestamp())
         if isinstance(timestamp, datetime):
             timestamp = int(timestamp.timestamp())
-        self.entries += [LogEntry(c, timestamp) for c in content]
-        await self.config.set(self.serialize())
+        self.append([LogEntry(c, timestamp) for c in content])
+        await self.persist()
+        if channel is None and self.message is not None:
+            self.schedule_edit()
+            return self.message
         self.channel = channel or self.channel
+        return await self.render()
+
+    async def ensure_message(self):
+        """Returns the log message, sending it if it doesn't exist"""
+        if self.message is None and self.message_id and self.channel:
+            await self.fetch_message()
+        if self.message is not None:
+            return self.message
+        return await self.render()
+
+    async def fetch_message(self):
+        # message is only fetched the first time it's needed
+        try:
+            self.message = await self.channel.fetch_message(self.message_id)
+        except HTTPException:
+            self.message_id = None
+
+    def schedule_edit(self):
+        if self.edit_task is None or self.edit_task.done():
+            self.edit_task = asyncio.get_running_loop().create_task(self._debounced_edit())
+
+    async def _debounced_edit(self):
+        await asyncio.sleep(LOG_EDIT_DEBOUNCE)
+        # posts from here on schedule another edit
+        self.edit_task = None
+        try:
+            await self.render()
+        except Exception as e:
+            debug_log.error("Failed to edit log message", exc_info=e)
+
+    async def flush_edit(self):
+        """Cancel a pending debounced edit and make it right away"""
+        if self.edit_task is None or self.edit_task.done():
+            return
+        self.edit_task.cancel()
+        self.edit_task = None
+        await self.render()
+
+    async def render(self):
+        if self.message is None and self.message_id and self.channel:
+            await self.fetch_message()
         try:
             self.message = await self.message.edit(content=str(self))
         except (AttributeError, NotFound):
@@ -65,10 +159,11 @@ class Log:
                 return None
         except HTTPException:  # thread archived most likely
             return None
+        self.message_id = self.message.id
         return self.message
     
     def serialize(self):
-        return [entry.serialize() for entry in self.entries]
+        return list(self.serialized)
     
     def __len__(self):
         return len(self.entries)
@@ -78,10 +173,11 @@ class LogEntry:
     def __init__(self, content: str, timestamp: int):
         self.content = content
         self.timestamp = timestamp
+        nowts = self.timestamp
+        self._str = f"-# <t:{nowts}:d><t:{nowts}:t> (<t:{nowts}:R>) - **{self.content}**"
     
     def __str__(self):
-        nowts = self.timestamp
-        return f"-# <t:{nowts}:d><t:{nowts}:t> (<t:{nowts}:R>) - **{self.content}**"
+        return self._str
     
     def serialize(self):
         return [self.timestamp, self.content]
@@ -142,15 +238,19 @@ class Feedback:
 
 
 class Application:
-    def __init__(self, member: discord.Member, guild: discord.Guild, config: Config, bot: Red, wufooDB: WufooDB=None):
+    def __init__(self, member: discord.Member, guild: discord.Guild, config: Config, bot: Red, thread_indexes: ThreadIndexes, wufooDB: WufooDB=None):
         self.guild = guild
         self.member = member
         self.config = config
+        self.state = MemberState(config.member(member))
         self.thread = None
+        self.thread_id: int = None
         self.checklist: Checklist
-        self.display_message: discord.Message
+        self.display_message: discord.Message = None
+        self.display_message_id: int = None
         self.log: Log
         self.bot = bot
+        self.thread_indexes = thread_indexes
         self.wufooDB = wufooDB
         self.displayed = False
         self.closed: bool
@@ -166,42 +266,65 @@ class Application:
         self.wufoo_skipped = False
 
     @classmethod
-    async def new(cls, member: discord.Member, guild: discord.Guild, config: Config, bot: Red, wufooDB: WufooDB=None):
+    async def new(
+        cls, member: discord.Member, guild: discord.Guild, config: Config, bot: Red, thread_indexes: ThreadIndexes,
+        wufooDB: WufooDB=None, data: dict=None, tracking_channel_id: int=None
+    ):
+        """Create the application for a member.
+        
+        `data` and `tracking_channel_id` can be given from a bulk config read to skip reading them here"""
         if member.bot:
             raise ValueError("Cannot create application for bot.")
-        app = cls(member, guild, config, bot, wufooDB)
+        app = cls(member, guild, config, bot, thread_indexes, wufooDB)
 
-        forum = guild.get_channel(await config.guild(guild).TRACKING_CHANNEL())
+        if tracking_channel_id is None:
+            tracking_channel_id = await config.guild(guild).TRACKING_CHANNEL()
+        forum = guild.get_channel(tracking_channel_id)
         if forum is None:
             raise ValueError("Tracking channel not found.")
 
         mconf = config.member(member)
-        await mconf.ID.set(member.id)
-
-        app.closed = await mconf.APP_CLOSED()
-        app.feedback = [Feedback.from_dict(d) for d in await mconf.FEEDBACK()]
-        app.images = [Image.from_dict(d) for d in await mconf.IMAGES()]
-        app.messages = await mconf.MESSAGES()
-        app.total_messages = await mconf.TOTAL_MESSAGES()
-        app.first_message_link = await mconf.FIRST_MESSAGE_LINK()
-        lcd = await mconf.LAST_CHECKLIST_DATE()
+        if data is None:
+            data = await mconf.all()
+        if data['ID'] != member.id:
+            await mconf.ID.set(member.id)
+
+        app.closed = data['APP_CLOSED']
+        app.feedback = [Feedback.from_dict(d) for d in data['FEEDBACK']]
+        app.images = [Image.from_dict(d) for d in data['IMAGES']]
+        app.messages = data['MESSAGES']
+        app.total_messages = data['TOTAL_MESSAGES']
+        app.first_message_link = data['FIRST_MESSAGE_LINK']
+        lcd = data['LAST_CHECKLIST_DATE']
         app.last_checklist_date = datetime.fromtimestamp(lcd) if lcd else datetime.now()
-        lmd = await mconf.LAST_MESSAGE_DATE()
+        lmd = data['LAST_MESSAGE_DATE']
         app.last_message_date = datetime.fromtimestamp(lmd) if lmd else datetime.now()
-        app.update = await mconf.UPDATE()
-
-        thread_id = await mconf.THREAD_ID()
-        thread = await get_thread(forum, thread_id)
+        app.update = data['UPDATE']
+        app.state.values.update({
+            "DISPLAY_HASH": data['DISPLAY_HASH'],
+            "DISPLAY_ATTACHMENTS_HASH": data['DISPLAY_ATTACHMENTS_HASH'],
+        })
+
+        app.thread_id = data['THREAD_ID']
+        app.display_message_id = data['DISPLAY_MESSAGE_ID']
+        unresolved = False
+        if app.thread_id is not None and app.closed:
+            # closed applications may never be touched again, so only check the cached active threads.
+            # archived threads are resolved lazily by resolve_thread
+            thread = forum.get_thread(app.thread_id)
+            unresolved = thread is None
+        else:
+            thread = await get_thread(forum, app.thread_id, thread_indexes)
         # if user's first join or thread got deleted, etc
-        if not thread:
+        if not thread and not unresolved:
             # record member
             await config.guild(guild).APP_MEMBERS.set_raw(f"{member.id}", value=True)
 
             # create checklist
-            await app.create_checklist()
+            await app.create_checklist(data['CHECKLIST'])
 
             # create log
-            app.log = await Log.new(mconf.LOG)
+            app.log = await Log.new(mconf.LOG, data=data['LOG'], state=app.state)
             if len(app.log) == 0:
                 if not isinstance(member, MissingMember):
                     await app.log.post("Joined", member.joined_at)
@@ -217,46 +340,43 @@ class Application:
                 pass
         else:
             app.displayed = True
-            app.checklist = await Checklist.new(app.config.member(member).CHECKLIST, app.bot, app.guild, app.member, app)
-            await app.set_thread(thread)
-            app.display_message = await app.thread.fetch_message(await app.config.member(member).DISPLAY_MESSAGE_ID())
-            logmsg = None
-            try:
-                logmsg = await app.thread.fetch_message(await app.config.member(member).LOG_MESSAGE_ID())
-            except:
-                pass
-            app.log = await Log.new(mconf.LOG, logmsg, app.thread)
-            if app.closed and not app.thread.archived:
-                await app.close()
-            elif not app.closed and app.thread.archived:
-                await app.open()
+            app.checklist = await Checklist.new(app.config.member(member).CHECKLIST, app.bot, app.guild, app.member, app, data=data['CHECKLIST'])
+            # display and log messages are fetched the first time they're needed
+            app.log = await Log.new(mconf.LOG, channel=thread, data=data['LOG'], message_id=data['LOG_MESSAGE_ID'], state=app.state)
+            if thread:
+                await app.set_thread(thread)
+                if app.closed and not app.thread.archived:
+                    await app.close()
+                elif not app.closed and app.thread.archived:
+                    await app.open()
         
         return app
     
+    @classmethod
+    def is_exempt(cls, member):
+        """Only use once the guild's exemptions are loaded, i.e. after startup"""
+        return Exemptions.for_guild(member.guild.id).is_exempt(member)
+
     @classmethod
     async def app_exempt(cls, config, member):
-        if await cls.has_manual_exempt(config, member):
-            return True
-        
-        return await cls.has_exempt_role(config, member)
+        exemptions = Exemptions.for_guild(member.guild.id)
+        if not exemptions.loaded:
+            await exemptions.load(config, member.guild)
+        return exemptions.is_exempt(member)
 
     @classmethod
     async def set_manual_exempt(cls, config, member, value):
         await config.member(member).APP_EXEMPT.set(value)
+        Exemptions.for_guild(member.guild.id).set_manual(member.id, value)
         return value
 
     @classmethod
-    async def has_manual_exempt(cls, config, member):
-        return await config.member(member).APP_EXEMPT()
+    def has_manual_exempt(cls, member):
+        return member.id in Exemptions.for_guild(member.guild.id).member_ids
     
     @classmethod
-    async def has_exempt_role(cls, config, member):
-        exempt_role = await config.guild(member.guild).APPLICATION_EXEMPT_ROLE()
-        if exempt_role:
-            for role in member.roles:
-                if role.id == exempt_role:
-                    return role
-        return False
+    def has_exempt_role(cls, member):
+        return Exemptions.for_guild(member.guild.id).role_of(member) or False
     
     def set_wufooDB(self, wufooDB):
         self.wufooDB = wufooDB
@@ -264,21 +384,54 @@ class Application:
     async def seen_activity(self):
         return len(await self.checklist.done_items()) > 0 or self.messages > 0
 
-    async def create_checklist(self):
+    async def create_checklist(self, data: dict=None):
+        """`data` can be the member's already read CHECKLIST config"""
         mconf = self.config.member(self.member)
-        if not await mconf.CHECKLIST():
+        if data is None:
+            data = await mconf.CHECKLIST()
+        if not data:
             cl = await Checklist.new_from_template(
                 await self.config.guild(self.guild).CHECKLIST_TEMPLATE(),
                 mconf.CHECKLIST, self.bot, self.guild, self.member, self
             )
         else:
-            cl = await Checklist.new(mconf.CHECKLIST, self.bot, self.guild, self.member, self)
+            cl = await Checklist.new(mconf.CHECKLIST, self.bot, self.guild, self.member, self, data=data)
         self.checklist = cl
 
     async def create_thread(self):
         return await self.display()
     
+    async def resolve_thread(self):
+        """Get the application's thread, looking it up the first time it's needed.
+        
+        Returns None if the application isn't displayed or its thread was deleted"""
+        if self.thread is None and self.displayed and self.thread_id is not None:
+            forum = self.guild.get_channel(await self.config.guild(self.guild).TRACKING_CHANNEL())
+            thread = await get_thread(forum, self.thread_id, self.thread_indexes) if forum else None
+            if thread is None:
+                # gets recreated on the next display
+                self.displayed = False
+            else:
+                self.thread = thread
+                self.log.channel = self.log.channel or thread
+        return self.thread if self.displayed else None
+
+    def forget_thread(self):
+        """The thread was deleted. It gets recreated on the next display"""
+        self.thread = None
+        self.display_message = None
+        self.displayed = False
+        self.log.message = None
+        self.log.message_id = None
+        self.log.channel = None
+
+    async def resolve_display_message(self):
+        if self.display_message is None and (thread := await self.resolve_thread()):
+            self.display_message = await thread.fetch_message(self.display_message_id)
+        return self.display_message
+
     async def open(self):
+        await self.resolve_thread()
         if self.displayed and (not self.thread.archived) and not self.closed:
             return
         if self.displayed:
@@ -294,6 +447,7 @@ class Application:
         self.bot.dispatch("gapps_app_opened", self)
 
     async def close(self):
+        await self.resolve_thread()
         if self.displayed and self.thread.archived and self.closed:
             return
         if self.displayed:
@@ -306,8 +460,10 @@ class Application:
         self.bot.dispatch("gapps_app_closed", self)
 
     async def set_thread(self, thread):
-        await self.config.member(self.member).THREAD_ID.set(thread.id)
+        if thread.id != self.thread_id:
+            await self.config.member(self.member).THREAD_ID.set(thread.id)
         self.thread = thread
+        self.thread_id = thread.id
         self.bot.dispatch("gapps_app_thread_set", self)
 
     async def record_checklist_update(self):
@@ -315,28 +471,40 @@ class Application:
         await self.config.member(self.member).LAST_CHECKLIST_DATE.set(self.last_checklist_date.timestamp())
 
     async def new_message(self, message: discord.Message):
+        # no I/O here. state gets written back in batches by flush
         self.messages += 1
         self.total_messages += 1
-        await self.config.member(self.member).MESSAGES.set(self.messages)
-        await self.config.member(self.member).TOTAL_MESSAGES.set(self.total_messages)
+        self.state.set("MESSAGES", self.messages)
+        self.state.set("TOTAL_MESSAGES", self.total_messages)
         if self.messages == 1:
-            await self.config.member(self.member).FIRST_MESSAGE_LINK.set(message.jump_url)
+            self.first_message_link = message.jump_url
+            self.state.set("FIRST_MESSAGE_LINK", self.first_message_link)
         self.last_message_date = datetime.now()
-        await self.config.member(self.member).LAST_MESSAGE_DATE.set(self.last_message_date.timestamp())
-        await self.config.member(self.member).UPDATE.set(True) 
+        self.state.set("LAST_MESSAGE_DATE", self.last_message_date.timestamp())
+        self.mark_dirty()
+
+    def mark_dirty(self, delay: float = None):
+        """Queue this application to be redisplayed. Repeated calls before the display happens are coalesced"""
+        self.state.set("UPDATE", True)
         self.update = True
+        self.bot.dispatch("gapps_app_dirty", self, delay)
     
     async def set_messages(self, messages: int):
-        await self.config.member(self.member).MESSAGES.set(messages)
+        self.state.set("MESSAGES", messages)
         self.messages = messages
 
+    async def flush(self):
+        await self.state.flush()
+
     async def add_feedback(self, message: discord.Message):
         fb = Feedback.from_message(message)
         self.feedback += [fb]
-        if self.displayed:
+        if await self.resolve_thread():
             await self.thread.send(embed=fb.embed)
             fb.sent = True
         await self.config.member(self.member).FEEDBACK.set([f.serialize() for f in self.feedback])
+        if self.displayed:
+            self.mark_dirty()
 
     async def send_rest_feedback(self, force=False):
         fbs = []
@@ -362,6 +530,8 @@ class Application:
             await self.config.member(self.member).IMAGE_MESSAGE_URLS.set([])
         img_messages = await self.config.member(self.member).IMAGE_MESSAGE_URLS()
 
+        await self.resolve_thread()
+
         async def send_images(ims, img_messages):
             if self.displayed:
                 msg = await self.thread.send(f"[images {len(img_messages) + 1}]\n* {', '.join([str(i) for i in ims])}")
@@ -391,50 +561,49 @@ class Application:
         if not emap:
             return
 
-        answers = "\n".join("\n".join(answer for answer in self.wufooDB.get(e['key']).entry_values()) for e in emap)
-        to_finds = []
+        citems = await self.checklist.checklist_items()
+        highlighter = Highlighter.for_terms(highlight_term(str(c.value)) for c in citems)
+        # render each application once, and use what was highlighted to tick the checklist
+        found = set()
+        for e in emap:
+            found |= self.wufooDB.get(e['key']).render(highlighter).complete().found
         app_sent_ci = False
         # update relavent checklist items
-        for c in await self.checklist.checklist_items():
+        for c in citems:
             ci_title = str(c.value).lower()
             if ci_title == 'application sent':
                 c.done = True
                 await self.checklist.update_item(c)
                 app_sent_ci = True
-            elif ci_title.startswith(('used', 'contains')):
-                to_find = ci_title.split(' ', 1)[-1]
-                to_finds.append(to_find)
-                if re.search(
-                        CONTAINS_PRE + re.escape(to_find) + CONTAINS_POST, 
-                        answers, flags=re.IGNORECASE
-                    ):
-                    c.done = True
-                    await self.checklist.update_item(c)
+            elif highlight_term(ci_title) in found:
+                c.done = True
+                await self.checklist.update_item(c)
         
-        if await Application.app_exempt(self.config, self.member):
+        if Application.is_exempt(self.member):
             return
         
+        await self.resolve_thread()
         if (not self.displayed) and not not_done_displaying:
             await self.display()
         elif not_done_displaying:
             self.bot.dispatch('gapps_trigger_app_display', self)
 
         for e in emap:
-            sent = await self.send_application(self.wufooDB.get(e['key']), to_finds)
+            sent = await self.send_application(self.wufooDB.get(e['key']), highlighter)
             e['sent'] = sent
         
-        await self.wufooDB.save_member_map()
+        await self.wufooDB.save_member_map(self.member.id)
 
         # log this event if there's no checklist item with the name "Application Sent"
         if not app_sent_ci:
             await self.log.post("Application Sent", datetime.now())
 
-    async def send_application(self, application, highlights=[]):
-        if await Application.app_exempt(self.config, self.member):
+    async def send_application(self, application, highlighter: Highlighter=None):
+        if Application.is_exempt(self.member):
             return False
         
         sent = None
-        for e in application.embeds(highlights):
+        for e in application.embeds(highlighter):
             sent = sent or await self.thread.send(embed=e)
         
         # pin first message
@@ -463,7 +632,7 @@ class Application:
         self.wufoo_skipped = False
 
     async def check_application_forms(self):
-        if await Application.app_exempt(self.config, self.member):
+        if Application.is_exempt(self.member):
             return
         mm = self.wufooDB.member_map.get(str(self.member.id))
         if not mm:
@@ -493,10 +662,10 @@ class Application:
             await self.notify(*[f"<t:{int(times[o].timestamp())}:R> since last {o}{' item' if o == 'checklist' else ''}" for o in offenses])
             await mconf.TRACK_ALARMS.set({**track_alarms, **{o: times[o].timestamp() for o in offenses}})
             if self.displayed:
-                await self.display()
+                self.mark_dirty()
 
     async def notify(self, *msgs, notify_role=True):
-        if not self.displayed:
+        if not await self.resolve_thread():
             return
         if notify_role:
             role = self.guild.get_role(await self.config.guild(self.guild).MENTION_ROLE())
@@ -510,7 +679,7 @@ class Application:
             await self._display()
 
     async def _display(self):    
-        if await Application.app_exempt(self.config, self.member):
+        if Application.is_exempt(self.member):
             if not self.closed:
                 await self.close()
             return
@@ -542,7 +711,6 @@ class Application:
 
         rolesmsg = "**Roles:**\n" + " ".join(r.mention for r in self.member.roles if r != self.guild.default_role)
 
-        await self.checklist.refresh_items(True, dispatch=False)
         checklistmsg = f"**Checklist:**\n" + await self.checklist.to_str()
 
         txt = f"{joinmsg}\n{msgsmsg}\n\n{updatemsg}\n\n{rolesmsg}\n\n{checklistmsg}"
@@ -577,25 +745,48 @@ class Application:
                     action(val)
                     break
 
-        paths = [simgs[s] for s in filter(None, reversed([status['single'], *status['compounds']]))]
+        paths = [simgs[s] for s in filter(None, reversed([status['single'], *status['compounds']]))][:10]
 
-        files = [discord.File(p) for p in paths][:10]
+        att_hash = attachments_hash(paths)
+        txt_hash = render_hash(txt, att_hash)
 
         forum = self.guild.get_channel(await self.config.guild(self.guild).TRACKING_CHANNEL())
 
-        thread_id = await mconf.THREAD_ID()
-        thread = await get_thread(forum, thread_id)
+        thread = await self.resolve_thread()
+
+        if thread is not None:
+            try:
+                # unarchive thread if archived
+                await self.open()
+                old_log_id = await mconf.LOG_MESSAGE_ID()
+                log_msg = await self.log.ensure_message()
+                if log_msg and old_log_id != log_msg.id:
+                    await mconf.LOG_MESSAGE_ID.set(log_msg.id)
+                if txt_hash == self.state.get("DISPLAY_HASH"):
+                    # nothing changed since the last time it was displayed
+                    new_msg = self.display_message
+                else:
+                    display_message = await self.resolve_display_message()
+                    if att_hash == self.state.get("DISPLAY_ATTACHMENTS_HASH"):
+                        new_msg = await display_message.edit(content=txt)
+                    else:
+                        new_msg = await display_message.edit(content=txt, attachments=[StatusImageCache.file(p) for p in paths])
+            except NotFound:
+                # thread or display message was deleted out from under us. make a new one
+                self.forget_thread()
+                thread = None
         
         if thread is None:
             thread_with_message = await forum.create_thread(
                 name=name,
                 content=txt,
-                files=files,
+                files=[StatusImageCache.file(p) for p in paths],
                 view=discord.ui.View().add_item(ChecklistSelect(self.checklist))
             )
             await self.set_thread(thread_with_message.thread)
             await mconf.DISPLAY_MESSAGE_ID.set(thread_with_message.message.id)
             self.display_message = thread_with_message.message
+            self.display_message_id = self.display_message.id
 
             await self.open()
 
@@ -610,17 +801,12 @@ class Application:
             await self.send_rest_feedback(force=True)
 
             new_msg = thread_with_message.thread
-        else:
-            # unarchive thread if archived
-            await self.open()
-            old_log_id = await mconf.LOG_MESSAGE_ID()
-            log_msg = await self.log.post([], datetime.now())
-            if old_log_id != log_msg.id:
-                await mconf.LOG_MESSAGE_ID.set(log_msg.id)
-            new_msg = await self.display_message.edit(content=txt, attachments=files)
 
+        if txt_hash != self.state.get("DISPLAY_HASH"):
+            self.state.set("DISPLAY_HASH", txt_hash)
+            self.state.set("DISPLAY_ATTACHMENTS_HASH", att_hash)
         self.displayed = True
-        await self.config.member(self.member).UPDATE.set(False)
+        self.state.set("UPDATE", False)
         self.update = False
 
         return new_msg
\ No newline at end of file
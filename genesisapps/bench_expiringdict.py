@@ -0,0 +1,39 @@
+"""Micro-benchmark for ExpiringDict: python -m genesisapps.bench_expiringdict"""
+import timeit
+
+from .expiringdict import ExpiringDict
+
+
+def churn(n=10000):
+    d = ExpiringDict(max_age=10, max_size=1000)
+    for i in range(n):
+        d[i] = i
+        d.get(i - 500)
+        i - 10 in d
+    return len(d)
+
+
+def expire(n=10000):
+    now = [0.0]
+    d = ExpiringDict(max_age=1, clock=lambda: now[0])
+    for i in range(n):
+        now[0] = i / 100
+        d[i] = i
+    return len(d)
+
+
+def rewrite(n=10000):
+    d = ExpiringDict(max_age=10)
+    for i in range(n):
+        d[i % 10] = i
+    return len(d)
+
+
+def main(runs=20):
+    for name, fn in [("set/get/contains with LRU bound", churn), ("continuous expiry", expire), ("rewriting hot keys", rewrite)]:
+        t = timeit.timeit(fn, number=runs)
+        print(f"{name}: {t / runs * 1000:.2f}ms per 10k ops, {fn()} keys left")
+
+
+if __name__ == "__main__":
+    main()
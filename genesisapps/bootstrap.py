@@ -0,0 +1,23 @@
+from redbot.core.config import Config
+
+
+class BootstrapSnapshot:
+    """A single bulk read of guild and member config shared by everything
+    that gets built when the cog starts up (applications, thread map,
+    nickname map, Wufoo databases, ...)"""
+    def __init__(self, guilds: dict, members: dict):
+        self.guilds = guilds
+        self.members = members
+
+    @classmethod
+    async def read(cls, config: Config):
+        return cls(await config.all_guilds(), await config.all_members())
+
+    def guild_settings(self, guild_id: int) -> dict:
+        return self.guilds.get(guild_id, {})
+
+    def members_of(self, guild_id: int) -> dict:
+        return self.members.get(guild_id, {})
+
+    def member_settings(self, guild_id: int, member_id: int) -> dict:
+        return self.members_of(guild_id).get(member_id)
@@ -26,7 +26,7 @@ class ChecklistItem:
     @classmethod
     def new(cls, guild: discord.Guild, *, type: str, value: Union[str, int], done: bool = False):
         if type == cls.ROLE:
-            return cls(discord.utils.get(guild.roles, id=value), done)
+            return cls(guild.get_role(value), done)
         else:
             return cls(value, done)
     
@@ -57,42 +57,62 @@ class ChecklistItem:
 
 
 class Checklist:
+    """A member's checklist or a guild's checklist template.
+
+    Items are read from config once and kept in memory after that. Changes
+    write just the changed item and bump `version`, which is what
+    `changed_items` and the gapps_checklist_update dispatch go off of"""
     def __init__(self, config_group: Group, bot: Red, guild: discord.Guild, member: discord.Member=None, app = None):
         self.member = member
         self.guild = guild
         self.config = config_group
-        self._update = True
-        self._initial_update = True
         self.bot = bot
         self.app = app
+        self._items: typing.Dict[Union[str, int], ChecklistItem] = None  # value -> item, in checklist order
+        self._item_versions = {}  # value -> version it last changed at
+        self.version = 0
+        self.seen_version = 0  # version as of the last refresh
+        self.previous_version = 0  # seen_version before the last refresh
+
+    def load(self, data: dict):
+        self._items = {}
+        for ci in data.values():
+            item = ChecklistItem.new(self.guild, **ci)
+            self._items[item.value] = item
+
+    async def ensure_loaded(self):
+        if self._items is None:
+            self.load(await self.config())
 
-    async def refresh_items(self, force=False, dispatch=True):
-        if force:
-            self._update = True
-        await self.checklist_items(dispatch)
+    def _changed(self, item: ChecklistItem):
+        self.version += 1
+        self._item_versions[item.value] = self.version
+
+    async def refresh_items(self, reload=False, dispatch=True):
+        """Acknowledge the changes made since the last refresh, dispatching 
+        gapps_checklist_update if there were any. Set reload to re-read the items from config"""
+        if reload or self._items is None:
+            self.load(await self.config())
+        changed = self.version != self.seen_version
+        self.previous_version = self.seen_version
+        self.seen_version = self.version
+        if changed and self.member and dispatch:
+            self.bot.dispatch("gapps_checklist_update", self)
 
     async def checklist_items(self, dispatch=True):
-        if self._update:
-            new_items = [
-                ChecklistItem.new(self.guild, **ci) 
-                for ci in (await self.config()).values()
-            ] 
-            self.previous_items = getattr(self, '_checklist_items', new_items)   
-            self._checklist_items = new_items
-            self._checklist_dict = {
-                ci.value: ci for ci in self._checklist_items
-            }
-            self._update = False
-            if self.member and not self._initial_update and dispatch:
-                self.bot.dispatch("gapps_checklist_update", self)
-        self._initial_update = False
-        return self._checklist_items
+        await self.ensure_loaded()
+        return self.items
+
+    @property
+    def items(self) -> typing.List[ChecklistItem]:
+        return list(self._items.values())
 
     @property
     def changed_items(self):
+        """Items that changed between the last two refreshes"""
         return [
-            cci for pci, cci in zip(self.previous_items, self._checklist_items) 
-            if str(pci) != str(cci)
+            ci for value, ci in self._items.items()
+            if self.previous_version < self._item_versions.get(value, 0) <= self.seen_version
         ]
 
     async def to_str(self):
@@ -102,7 +122,7 @@ class Checklist:
         )
 
     def __repr__(self):
-        return f"Checklist({self.member}, {self.guild}, {[ci for ci in self._checklist_items]})"
+        return f"Checklist({self.member}, {self.guild}, {self.items if self._items is not None else '...'})"
 
     async def is_done(self):
         items = await self.checklist_items()
@@ -116,17 +136,22 @@ class Checklist:
         return (await self.checklist_items())[index]
     
     async def get_item_by_value(self, value: str, dispatch=False):
-        await self.checklist_items(dispatch)
-        return self._checklist_dict[value]
+        await self.ensure_loaded()
+        return self._items[value]
 
     async def add_item(self, item: ChecklistItem, defer_post=False):
-        self._update = True
+        await self.ensure_loaded()
+        self._items[item.value] = item
+        self._changed(item)
         await self.config.set_raw(item.value, value=item.to_dict())
         if not defer_post and self.app:
             await self.app.log.post(str(item), datetime.now())
     
     async def remove_item(self, item: ChecklistItem):
-        self._update = True
+        await self.ensure_loaded()
+        self._items.pop(item.value, None)
+        self._item_versions.pop(item.value, None)
+        self.version += 1
         await self.config.clear_raw(item.value)
         if self.app:
             await self.app.log.post(str(item), datetime.now())
@@ -134,33 +159,51 @@ class Checklist:
     async def update_item(self, item: ChecklistItem, defer_post=False):
         await self.add_item(item, defer_post)
 
+    async def update_items(self, items: typing.List[ChecklistItem]):
+        """Write several items without logging each one"""
+        await self.ensure_loaded()
+        for item in items:
+            self._items[item.value] = item
+            self._changed(item)
+        # item by item, rewriting the whole group could undo a concurrent set_raw/clear_raw
+        for item in items:
+            await self.config.set_raw(str(item.value), value=item.to_dict())
+
     async def update_roles(self, member: discord.Member):
         cis = {ci.value: ci for ci in await self.checklist_items() if ci.type == ChecklistItem.ROLE}
-        cis = {r.id: cis[r.id] for r in member.roles if r.id in cis}
+        return await self.complete_roles([r.id for r in member.roles if r.id in cis])
 
+    async def complete_roles(self, role_ids: typing.Iterable[int]):
+        """Tick the role items for the given roles with one log post and one redisplay"""
+        await self.ensure_loaded()
         cdones = []
-        for ci in cis.values():
-            if not ci.done:
+        for rid in role_ids:
+            ci = self._items.get(rid)
+            if ci and ci.type == ChecklistItem.ROLE and not ci.done:
                 ci.done = True
                 cdones.append(ci)
-                await self.update_item(ci, defer_post=True)
         if cdones:
+            await self.update_items(cdones)
             if self.app:
                 await self.app.log.post([str(ci) for ci in cdones], datetime.now())
             await self.refresh_items()
             if self.app:
-                await self.app.display()
+                self.app.mark_dirty()
 
         return cdones
 
     async def copy_from_template(self, template: dict):
         await self.config.set(template)
-        await self.refresh_items()
+        self.load(template)
     
     @classmethod
-    async def new(cls, *args, **kwargs):
+    async def new(cls, *args, data: dict=None, **kwargs):
+        """`data` can be the checklist's already read config to skip reading it again"""
         cl = Checklist(*args, **kwargs)
-        await cl.refresh_items()
+        if data is not None:
+            cl.load(data)
+        else:
+            await cl.ensure_loaded()
         return cl
 
     @classmethod
@@ -185,16 +228,16 @@ class ChecklistSelect(DynamicItem[Select], template=r"gapps:ChecklistSelect:(?P<
                     discord.SelectOption(
                         label=ci.clean_str(),
                         value=str(ci.value)
-                    ) for ci in checklist._checklist_items
+                    ) for ci in checklist.items
                 ],
                 custom_id=f"gapps:ChecklistSelect:{self.user_id}",
-                min_values=0, max_values=len(checklist._checklist_items)
+                min_values=0, max_values=len(checklist.items)
             )
         )
 
     @classmethod
     async def new(cls, checklist: Checklist):
-        await checklist.refresh_items(dispatch=False)
+        await checklist.ensure_loaded()
         return cls(checklist)
     
     @classmethod
@@ -202,14 +245,14 @@ class ChecklistSelect(DynamicItem[Select], template=r"gapps:ChecklistSelect:(?P<
         cog = interaction.client.get_cog("GenesisApps")
         user_id = int(match.group("user_id"))
         member = cog.get_member(interaction.guild, user_id)
-        app = cog.application_for(member)
-        self = await cls.new(
-            Checklist(
-                cog.config.member(member).CHECKLIST, 
-                cog.bot, interaction.guild, member, app
-            ),
-        )
-        return self
+        try:
+            app = cog.application_for(member)
+        except KeyError:  # the member left or their application was closed
+            app = None
+        if app is None or app.checklist is None:
+            return await cls.new(Checklist(cog.config.member(member).CHECKLIST, cog.bot, interaction.guild, member))
+        # the app's checklist is the one kept up to date in memory
+        return await cls.new(app.checklist)
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         return True 
@@ -228,7 +271,7 @@ class ChecklistSelect(DynamicItem[Select], template=r"gapps:ChecklistSelect:(?P<
         if self.checklist.app and items:
             await self.checklist.app.log.post([str(ci) for ci in items], datetime.now())
         
-        await self.checklist.refresh_items(True)
+        await self.checklist.refresh_items()
         nl = '' if len(items) == 1 else '\n-# '
         return await interaction.response.send_message(
             f"{interaction.user.mention} toggled {nl}" +
@@ -0,0 +1,70 @@
+import asyncio
+import heapq
+from time import monotonic
+
+from .log import log
+
+
+DISPLAY_DEBOUNCE = 5  # seconds
+
+
+class DisplayQueue:
+    """Debounced queue of applications waiting to be redisplayed.
+
+    Pushing an application that is already waiting coalesces into the pending
+    display instead of queuing another one."""
+    def __init__(self, debounce: float = DISPLAY_DEBOUNCE):
+        self.debounce = debounce
+        self.pending = {}  # member id -> (due, app)
+        self.heap = []  # (due, member id)
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task = None
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __contains__(self, app):
+        return app.member.id in self.pending
+
+    def push(self, app, delay: float = None):
+        delay = self.debounce if delay is None else delay
+        mid = app.member.id
+        due = monotonic() + delay
+        if mid in self.pending and self.pending[mid][0] <= due:
+            return
+        self.pending[mid] = (due, app)
+        heapq.heappush(self.heap, (due, mid))
+        self.wakeup.set()
+
+    def start(self, loop):
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self.run())
+        return self.task
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+            due, mid = self.heap[0]
+            delay = due - monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self.heap)
+            # skip entries that were superseded by an earlier push
+            if self.pending.get(mid, (None,))[0] != due:
+                continue
+            _, app = self.pending.pop(mid)
+            try:
+                await app.display()
+            except Exception as e:
+                log.error(f"Failed to display application for {app.member}", exc_info=e)
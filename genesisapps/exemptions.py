@@ -0,0 +1,58 @@
+import discord
+from redbot.core.config import Config
+
+from typing import Iterable, Optional
+
+
+class Exemptions:
+    """A guild's exempt role and manually exempt members, kept in memory so
+    checking whether a member is exempt doesn't read config.
+
+    The exemptrole/exempt commands and role deletions update it directly"""
+    guilds = {}  # guild id -> Exemptions
+
+    def __init__(self, role_id: int=None, member_ids: Iterable[int]=()):
+        self.role_id = role_id
+        self.member_ids = set(member_ids)
+        self.loaded = False
+
+    @classmethod
+    def for_guild(cls, guild_id: int) -> "Exemptions":
+        if guild_id not in cls.guilds:
+            cls.guilds[guild_id] = cls()
+        return cls.guilds[guild_id]
+
+    @classmethod
+    def load_snapshot(cls, snapshot):
+        for gid, settings in snapshot.guilds.items():
+            exemptions = cls.for_guild(gid)
+            exemptions.role_id = settings["APPLICATION_EXEMPT_ROLE"]
+            exemptions.member_ids = set(
+                mid for mid, conf in snapshot.members_of(gid).items() if conf.get("APP_EXEMPT")
+            )
+            exemptions.loaded = True
+
+    async def load(self, config: Config, guild: discord.Guild):
+        """Read the guild's exemptions if they weren't loaded from the startup snapshot yet"""
+        self.role_id = await config.guild(guild).APPLICATION_EXEMPT_ROLE()
+        self.member_ids = set(
+            mid for mid, conf in (await config.all_members(guild)).items() if conf.get("APP_EXEMPT")
+        )
+        self.loaded = True
+
+    def set_manual(self, member_id: int, value: bool):
+        if value:
+            self.member_ids.add(member_id)
+        else:
+            self.member_ids.discard(member_id)
+
+    def role_of(self, member) -> Optional[discord.Role]:
+        if not self.role_id:
+            return None
+        if isinstance(member, discord.Member):
+            return member.get_role(self.role_id)
+        # MissingMembers
+        return next((r for r in member.roles if r.id == self.role_id), None)
+
+    def is_exempt(self, member) -> bool:
+        return member.id in self.member_ids or self.role_of(member) is not None
@@ -1,38 +1,96 @@
-from datetime import datetime,timedelta
-from typing import Any
+import heapq
+import itertools
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from time import monotonic
+from typing import Any, Callable, Optional
 
-class ExpiringDict(dict):
-    def __init__(self, *args, **kwargs):
-        self.max_age = kwargs.pop('max_age', 0)
-        if self.max_age <= 0:
+
+class ExpiringDict(MutableMapping):
+    """Mapping whose keys expire `max_age` seconds after they were set.
+
+    Expired keys are never visible: `in`, `get`, `pop`, `len` and iteration
+    all skip them. Expiry times are kept in a min-heap and expired keys are
+    evicted as part of normal use, so keys that are never looked up again
+    don't pile up. If `max_size` is given, the least recently used keys are
+    dropped once it's exceeded"""
+    def __init__(self, *args, max_age: float=0, max_size: Optional[int]=None, clock: Callable[[], float]=monotonic, **kwargs):
+        if max_age <= 0:
             raise ValueError('max_age must be given as > 0')
-        self.delta = timedelta(seconds=self.max_age)
+        if max_size is not None and max_size <= 0:
+            raise ValueError('max_size must be > 0')
+        self.max_age = max_age
+        self.max_size = max_size
+        self.clock = clock
+        self._data = OrderedDict()  # key -> (value, expires at), least recently used first
+        self._heap = []  # (expires at, counter, key). may hold outdated entries for keys that were set again
+        self._counter = itertools.count()
         self.update(*args, **kwargs)
 
+    def evict(self, now: float=None):
+        """Drop every expired key"""
+        now = self.clock() if now is None else now
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires, _, key = heapq.heappop(heap)
+            item = self._data.get(key)
+            if item is not None and item[1] == expires:
+                del self._data[key]
+
+    def _compact(self):
+        # keys that are set over and over leave outdated heap entries behind
+        self._heap = [(expires, next(self._counter), key) for key, (_, expires) in self._data.items()]
+        heapq.heapify(self._heap)
+
     def __setitem__(self, key: Any, value: Any):
-        super().__setitem__(key, (value, datetime.now()))
-    
+        now = self.clock()
+        self.evict(now)
+        expires = now + self.max_age
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        heapq.heappush(self._heap, (expires, next(self._counter), key))
+        if self.max_size is not None:
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        if len(self._heap) > 2 * len(self._data) + 16:
+            self._compact()
+
+    def _live(self, key: Any):
+        value, expires = self._data[key]
+        if expires <= self.clock():
+            del self._data[key]
+            raise KeyError(key)
+        return value
+
     def __getitem__(self, key: Any) -> Any:
-        ret = super().__getitem__(key)
-        if ret[1] + self.delta < datetime.now():
-            del self[key]
-            raise KeyError
-        return ret[0]
-    
-    def update(self, *args, **kwargs):
-        for k, v in dict(*args, **kwargs).items():
-            self[k] = v
-        
-    def pop(self, key, *args, **kwargs):
+        value = self._live(key)
+        self._data.move_to_end(key)
+        return value
+
+    def __delitem__(self, key: Any):
+        self._live(key)
+        del self._data[key]
+
+    def __contains__(self, key: Any) -> bool:
         try:
-            ret = self[key]
-        except KeyError as e:
-            if 'default' in kwargs:
-                return kwargs['default']
-            if args:
-                return args[0]
-            raise e
-        
-        del self[key]
-
-        return ret
\ No newline at end of file
+            self._live(key)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        self.evict()
+        return len(self._data)
+
+    def __iter__(self):
+        self.evict()
+        return iter(list(self._data))
+
+    def clear(self):
+        self._data.clear()
+        self._heap.clear()
+
+    def __repr__(self):
+        self.evict()
+        return f"ExpiringDict({{{', '.join(f'{k!r}: {v!r}' for k, (v, _) in self._data.items())}}}, max_age={self.max_age})"
+
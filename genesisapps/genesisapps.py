@@ -4,25 +4,45 @@ from discord.ui import View
 from redbot.core import commands, checks
 from redbot.core.bot import Red
 from redbot.core.config import Config, Group
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.predicates import MessagePredicate
 from redbot.core.utils.chat_formatting import pagify
 
 import re
+import json
 import asyncio
+import secrets
 from datetime import datetime, timedelta
-from typing import Union, List
+from typing import Union, List, Optional
 
-from .wufoo import Wufoo, FormNotFound, DiscordNameFieldNotFound, Entry, WufooDB
+from .wufoo import Wufoo, FormNotFound, DiscordNameFieldNotFound, Entry, WufooDB, RateLimited
 from .checklist import Checklist, ChecklistItem, ChecklistSelect
-from .helpers import get_thread, MissingMember
+from .helpers import get_thread, MissingMember, Highlighter, highlight_term
 from .application import Application, Image, identifiable_name
 from .expiringdict import ExpiringDict
 from .statusimage import StatusImage, statuses
+from .scheduler import ShardedScheduler
+from .displayqueue import DisplayQueue
+from .matcher import MentionMatcher
+from .bootstrap import BootstrapSnapshot
+from .exemptions import Exemptions
+from .reconciler import RoleReconciler
+from .threadindex import ThreadIndexes
+from .wufoostore import WufooStore
+from .wufoopoller import WufooPoller
+from .webhook import WufooWebhook
 from .log import log
 
 
+IMPORT_CHUNK_SIZE = 1000  # entries per store write when bulk importing
+
 RE_API_KEY = re.compile(r"^[A-Za-z0-9]{4}-[A-Za-z0-9]{4}-[A-Za-z0-9]{4}-[A-Za-z0-9]{4}$")
 
+STATE_FLUSH_INTERVAL = 30  # seconds
+BOOTSTRAP_CONCURRENCY = 10
+DISPLAY_LOOP_INTERVAL = 60*10  # seconds
+AUDIT_LOG_CACHE_SIZE = 500  # per guild
+
 CHECKLIST_CHOICES = [
     "message",
     "checklist",
@@ -64,6 +84,18 @@ class AlarmConverter(commands.Converter):
         return argument
 
 
+class GuildPass:
+    """What one display loop pass needs to know about a guild, shared by its applications"""
+    def __init__(self, guild: discord.Guild, new_day: bool, new_hour: bool,
+                 joined_before_autokick: Optional[datetime], autokick_msg: Optional[str]):
+        self.guild = guild
+        self.new_day = new_day
+        self.new_hour = new_hour
+        self.joined_before_autokick = joined_before_autokick
+        self.autokick_msg = autokick_msg
+        self.kicked: List[discord.Member] = []
+
+
 class GenesisApps(commands.Cog):
     """Application management and tracking for the Genesis server. 
     
@@ -101,7 +133,9 @@ class GenesisApps(commands.Cog):
             "FEEDBACK": [],
             "LAST_MESSAGE_DATE": None,
             "LAST_CHECKLIST_DATE": None,
-            "TRACK_ALARMS": {kind: 0 for kind in CHECKLIST_CHOICES}
+            "TRACK_ALARMS": {kind: 0 for kind in CHECKLIST_CHOICES},
+            "DISPLAY_HASH": None,
+            "DISPLAY_ATTACHMENTS_HASH": None,
         })
 
         self.config.register_guild(**{
@@ -114,6 +148,10 @@ class GenesisApps(commands.Cog):
             "WUFOO_ENTRIES": {},
             "WUFOO_ENTRY_QUEUE": {},
             "WUFOO_MEMBER_MAP": {}, # TODO: rewrite with this as part of member/application...
+            "WUFOO_HIGH_WATER_MARK": 0,  # newest EntryId pulled
+            "WUFOO_INCOMPLETE_ENTRIES": {},  # EntryId -> DateCreated of unfinished entries to recheck
+            "WUFOO_FORM_SCHEMA": None,  # form hash and field id -> title, see Wufoo.load_schema
+            "WUFOO_WEBHOOK_KEY": None,  # handshake key Wufoo sends with webhook posts
             "CHECKLIST_TEMPLATE": {},
             "MENTION_ROLE": None,  # also mention when application complete
             "CHECKLIST_ROLES": {},  # TODO: roles that are allowed to toggle the checklist items
@@ -126,15 +164,33 @@ class GenesisApps(commands.Cog):
             "APP_MEMBERS": {}
         })
 
+        self.config.register_global(**{
+            "WEBHOOK_HOST": "0.0.0.0",
+            "WEBHOOK_PORT": None,  # webhook receiver is off when unset
+        })
+
         bot.add_dynamic_items(ChecklistSelect)
 
+        self.thread_indexes = ThreadIndexes(cog_data_path(self) / "thread_index.json")
+        self.thread_indexes.load()
+        self.wufoo_store = WufooStore(cog_data_path(self) / "wufoo.sqlite3")
+
         self.wufoo_apis = {}
+        self.wufoo_poller = WufooPoller(self.wufoo_apis)
+        self.webhook_keys = {}
+        self.webhook = WufooWebhook(self.wufoo_apis.get, self.webhook_keys.get)
         self.applications = {}
         self.thread_member_map = {}
         self.nickname_map = {}
         self.audit_log_cache = {}
+        self.scheduler = ShardedScheduler()
+        self.display_queues = {}
+        self.mention_matchers = {}
+        self.role_reconcilers = {}
         self.ready = False
         self.ready_lock = asyncio.Lock()
+        self.apps_loaded = False
+        self.guild_ready_events = {}
 
     def get_member(self, guild: discord.Guild, member_id: int):
         if not (member := guild.get_member(member_id)):
@@ -161,50 +217,92 @@ class GenesisApps(commands.Cog):
         for p in pagify("**Unlinked applications:**\n" + s):
             await ctx.send(p)
 
-    async def setup_wufoo_api(self, gid: int,  form_url: str, api_key: str, discord_name_field: str):
-        self.wufoo_apis[gid] = Wufoo(form_url, api_key, discord_name_field)
+    async def setup_wufoo_api(self, gid: int,  form_url: str, api_key: str, discord_name_field: str, settings: dict=None, use_cached_schema: bool=False):
+        wapi = Wufoo(form_url, api_key, discord_name_field)
         guild = self.bot.get_guild(gid)
-        await self.wufoo_apis[gid].setup(self.bot, self.config.guild(guild), self.bot.get_guild(gid))
-        return self.wufoo_apis[gid]
+        await wapi.setup(self.bot, self.config.guild(guild), guild, self.wufoo_store, settings, use_cached_schema)
+        # only replace the guild's current integration once the new one is known to work
+        self.wufoo_apis[gid] = wapi
+        return wapi
     
-    async def setup_all_wufoo(self):
-        guild_settings = await self.config.all_guilds()
-        for gid, settings in guild_settings.items():
-            if settings["WUFOO_API_KEY"]:
+    async def setup_all_wufoo(self, snapshot: BootstrapSnapshot):
+        # guilds with a cached form schema don't hit Wufoo here, the rest resolve their forms concurrently
+        async def setup(gid, settings):
+            try:
                 await self.setup_wufoo_api(gid, 
                     settings["WUFOO_FORM_URL"], 
                     settings["WUFOO_API_KEY"], 
-                    settings["WUFOO_DISCORD_USERNAME_FIELD"]
+                    settings["WUFOO_DISCORD_USERNAME_FIELD"],
+                    settings,
+                    use_cached_schema=True
                 )
+            except Exception as e:
+                self.wufoo_apis.pop(gid, None)
+                log.error(f"Failed to set up Wufoo for guild {gid}", exc_info=e)
+        await asyncio.gather(*[
+            setup(gid, settings) for gid, settings in snapshot.guilds.items() if settings["WUFOO_API_KEY"]
+        ])
+
+    async def setup_applications(self, snapshot: BootstrapSnapshot):
+        semaphore = asyncio.Semaphore(BOOTSTRAP_CONCURRENCY)
+        await asyncio.gather(*[
+            self.setup_guild_applications(gid, settings, snapshot.members_of(gid), semaphore)
+            for gid, settings in snapshot.guilds.items()
+        ])
+        self.apps_loaded = True
+        for event in self.guild_ready_events.values():
+            event.set()
+
+    async def setup_guild_applications(self, gid: int, settings: dict, members_data: dict, semaphore: asyncio.Semaphore):
+        guild = self.bot.get_guild(gid)
+        if guild is None:
+            return
 
-    async def setup_applications(self):
-        guild_settings = await self.config.all_guilds()
-        for gid, settings in guild_settings.items():
-            guild = self.bot.get_guild(gid)
-            for smid in settings["APP_MEMBERS"]:
-                member = self.get_member(guild, int(smid))
+        async def setup_application(member_id):
+            member = self.get_member(guild, member_id)
+            async with semaphore:
                 try:
-                    app = await Application.new(member, guild, self.config, self.bot)
+                    app = await Application.new(
+                        member, guild, self.config, self.bot, self.thread_indexes,
+                        data=members_data.get(member_id), tracking_channel_id=settings["TRACKING_CHANNEL"]
+                    )
                     self.set_application_for(member, app)
                 except Exception as e:
                     log.error(e)
-                    continue
-                if  not app.closed and (isinstance(member, MissingMember) or await Application.app_exempt(self.config, member)):
+                    return
+                if  not app.closed and (isinstance(member, MissingMember) or Application.is_exempt(member)):
                     await app.close()
 
+        await asyncio.gather(*[setup_application(int(smid)) for smid in settings["APP_MEMBERS"]])
+        self.guild_ready_events.setdefault(gid, asyncio.Event()).set()
+        log.info(f'apps set up for {guild.name}')
+
+    def guild_ready(self, guild: discord.Guild):
+        if self.apps_loaded:
+            return True
+        event = self.guild_ready_events.get(guild.id)
+        return event is not None and event.is_set()
+
+    async def wait_until_guild_ready(self, guild: discord.Guild):
+        if self.guild_ready(guild):
+            return
+        await self.guild_ready_events.setdefault(guild.id, asyncio.Event()).wait()
+
     
-    async def setup_thread_member_map(self):
-        gmconf = await self.config.all_members()
-        for gid, mconf in gmconf.items():
+    def setup_thread_member_map(self, snapshot: BootstrapSnapshot):
+        for gid, mconf in snapshot.members.items():
             guild = self.bot.get_guild(gid)
+            if guild is None:
+                continue
             for mid, conf in mconf.items():
                 m = self.get_member(guild, mid)
                 self.thread_member_map[conf["THREAD_ID"]] = m
         
-    async def setup_nickname_map(self):
-        gmconf = await self.config.all_members()
-        for gid, mconf in gmconf.items():
+    def setup_nickname_map(self, snapshot: BootstrapSnapshot):
+        for gid, mconf in snapshot.members.items():
             guild = self.bot.get_guild(gid)
+            if guild is None:
+                continue
             self.nickname_map[gid] = {}
             for mid, conf in mconf.items():
                 member = self.get_member(guild, mid)
@@ -214,8 +312,16 @@ class GenesisApps(commands.Cog):
     def set_application_for(self, member, app, guild=None):
         member = self.memberify(member, guild)
         self.applications.setdefault(member.guild.id, {})[member.id] = app
+        self.role_reconciler_for(member.guild).track(app)
+
+    def role_reconciler_for(self, guild: discord.Guild):
+        if guild.id not in self.role_reconcilers:
+            self.role_reconcilers[guild.id] = RoleReconciler(guild)
+        return self.role_reconcilers[guild.id]
 
     async def get_or_set_application_for(self, member, guild=None):
+        # don't make a second application for a member whose application is still loading
+        await self.wait_until_guild_ready(member.guild)
         try:
             app = self.application_for(member, guild)
         except KeyError:
@@ -225,7 +331,7 @@ class GenesisApps(commands.Cog):
             self.set_application_for(
                 member, 
                 app := await Application.new(
-                    member, member.guild, self.config, self.bot, **extra
+                    member, member.guild, self.config, self.bot, self.thread_indexes, **extra
                 ), 
                 guild
             )
@@ -234,18 +340,39 @@ class GenesisApps(commands.Cog):
     def _set_nicknames_for(self, member, nicknames):
         for nick in nicknames:
             self.nickname_map.setdefault(member.guild.id, {})[nick] = member
+        self.mention_matcher_for(member.guild).set_nicknames(member.id, nicknames)
+
+    def mention_matcher_for(self, guild: discord.Guild):
+        return self.mention_matchers.setdefault(guild.id, MentionMatcher())
+
+    def setup_mention_matchers(self, snapshot: BootstrapSnapshot):
+        for gid, apps in self.applications.items():
+            guild = self.bot.get_guild(gid)
+            matcher = self.mention_matcher_for(guild)
+            for app in apps.values():
+                if not app.closed:
+                    mconf = snapshot.member_settings(gid, app.member.id) or {}
+                    matcher.add(app.member, mconf.get('NICKNAMES', []))
 
     async def _setup(self):
+        await self.bot.wait_until_red_ready()
         if not self.ready:
             async with self.ready_lock:
-                await self.setup_applications()
+                if self.ready:
+                    return
+                # one full read of config shared by everything below
+                snapshot = await BootstrapSnapshot.read(self.config)
+                Exemptions.load_snapshot(snapshot)
+                await self.setup_applications(snapshot)
                 log.info('apps set up')
-                await self.setup_thread_member_map()
+                self.setup_thread_member_map(snapshot)
                 log.info('threads set up')
-                await self.setup_nickname_map()
+                self.setup_nickname_map(snapshot)
                 log.info('nicks set up')
+                self.setup_mention_matchers(snapshot)
+                log.info('mention matchers set up')
                 try:
-                    await self.setup_all_wufoo()
+                    await self.setup_all_wufoo(snapshot)
                     log.info('wufoo set up')
                 except Exception as e:
                     log.error(e)
@@ -257,19 +384,109 @@ class GenesisApps(commands.Cog):
                                 if app.wufoo_skipped:
                                     await app.post_if_needed()
                     log.info('posted apps')
+                self.wufoo_poller.start(self.bot.loop)
+                await self.setup_webhook(snapshot)
+                self.index_task = self.bot.loop.create_task(self.scan_thread_indexes(snapshot))
+                # pick back up displays that were pending when the cog was unloaded
+                for apps in self.applications.values():
+                    for app in apps.values():
+                        if app.update:
+                            app.mark_dirty()
             log.info('setup complete')
         self.ready = True
 
+    async def setup_webhook(self, snapshot: BootstrapSnapshot):
+        for gid, settings in snapshot.guilds.items():
+            if settings["WUFOO_WEBHOOK_KEY"]:
+                self.webhook_keys[gid] = settings["WUFOO_WEBHOOK_KEY"]
+        port = await self.config.WEBHOOK_PORT()
+        if port:
+            try:
+                await self.webhook.start(await self.config.WEBHOOK_HOST(), port)
+            except OSError as e:
+                log.error(f"Could not start Wufoo webhook on port {port}", exc_info=e)
+
+    async def scan_thread_indexes(self, snapshot: BootstrapSnapshot):
+        """Seed the thread index of tracking forums that haven't been indexed yet.
+        This only ever pages through a forum's archive once"""
+        for gid, settings in snapshot.guilds.items():
+            guild = self.bot.get_guild(gid)
+            if guild is None or not (forum := guild.get_channel(settings["TRACKING_CHANNEL"])):
+                continue
+            index = self.thread_indexes.for_forum(forum)
+            if index.scanned:
+                continue
+            try:
+                await index.scan(forum)
+                log.info(f'thread index built for {forum.name}')
+            except Exception as e:
+                log.error(f"Failed to build thread index for {forum.name}", exc_info=e)
+
     @commands.Cog.listener()
     async def on_ready(self):
         await self._setup()
 
     async def cog_load(self):
-        await self._setup()
+        # guilds become usable as soon as their applications are loaded. see wait_until_guild_ready
+        self.setup_task = self.bot.loop.create_task(self._setup())
         self.loop_task = self.bot.loop.create_task(self.display_loop())
+        self.flush_task = self.bot.loop.create_task(self.flush_loop())
 
     async def cog_unload(self):
+        self.setup_task.cancel()
         self.loop_task.cancel()
+        self.flush_task.cancel()
+        self.wufoo_poller.cancel()
+        await self.webhook.stop()
+        for queue in self.display_queues.values():
+            queue.cancel()
+        if hasattr(self, "index_task"):
+            self.index_task.cancel()
+        await self.save_thread_indexes()
+        self.wufoo_store.close()
+        await self.flush_member_states()
+        await self.flush_log_edits()
+
+    def display_queue_for(self, guild: discord.Guild):
+        if guild.id not in self.display_queues:
+            self.display_queues[guild.id] = DisplayQueue()
+        queue = self.display_queues[guild.id]
+        queue.start(self.bot.loop)
+        return queue
+
+    async def flush_member_states(self):
+        for apps in list(self.applications.values()):
+            for app in list(apps.values()):
+                try:
+                    await app.flush()
+                except Exception as e:
+                    log.error(f"Failed to flush state for {app.member}", exc_info=e)
+
+    async def flush_log_edits(self):
+        for apps in list(self.applications.values()):
+            for app in list(apps.values()):
+                try:
+                    await app.log.flush_edit()
+                except Exception as e:
+                    log.error(f"Failed to edit the log of {app.member}", exc_info=e)
+
+    async def save_thread_indexes(self):
+        try:
+            await self.thread_indexes.save()
+        except OSError as e:
+            log.error("Failed to save thread index", exc_info=e)
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(STATE_FLUSH_INTERVAL)
+            await self.flush_member_states()
+            await self.save_thread_indexes()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        exemptions = Exemptions.for_guild(role.guild.id)
+        if exemptions.role_id == role.id:
+            exemptions.role_id = None
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
@@ -280,6 +497,7 @@ class GenesisApps(commands.Cog):
         if before.display_name != after.display_name or before.name != after.name:
             app = await self.get_or_set_application_for(after)
             await self.config.member(after).NAME.set(identifiable_name(after))
+            self.mention_matcher_for(after.guild).update_member(after)
         before_ids = set([r.id for r in before.roles])
         after_ids = set([r.id for r in after.roles])
         if before_ids == after_ids:
@@ -304,6 +522,7 @@ class GenesisApps(commands.Cog):
         app = await self.get_or_set_application_for(after)
 
         await app.checklist.update_roles(after)
+        self.role_reconciler_for(after.guild).track(app)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
@@ -345,7 +564,11 @@ class GenesisApps(commands.Cog):
         if tracking_channel is None:
             return
 
-        was_here_before = len(await self.config.member(member).LOG())
+        try:
+            # the log's config may be behind the app's unflushed state
+            was_here_before = len(self.application_for(member).log)
+        except KeyError:
+            was_here_before = len(await self.config.member(member).LOG())
         
         app = await self.get_or_set_application_for(member)
         
@@ -367,7 +590,7 @@ class GenesisApps(commands.Cog):
     async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
         if entry.action in (discord.AuditLogAction.kick, discord.AuditLogAction.ban):
             if entry.guild.id not in self.audit_log_cache:
-                self.audit_log_cache[entry.guild.id] = ExpiringDict(max_age=10)
+                self.audit_log_cache[entry.guild.id] = ExpiringDict(max_age=10, max_size=AUDIT_LOG_CACHE_SIZE)
             self.audit_log_cache[entry.guild.id][entry.target.id] = entry
             return
         
@@ -377,27 +600,36 @@ class GenesisApps(commands.Cog):
 
     @commands.Cog.listener()
     async def on_gapps_checklist_update(self, checklist: Checklist):
+        if checklist.app is None:
+            # toggled from a select of a member who left or whose application was closed
+            return
+        # role items may have been unticked by hand
+        self.role_reconciler_for(checklist.guild).track(checklist.app)
         await checklist.app.record_checklist_update()
-        await checklist.app.display()
+        # goes through the display queue so it merges with other pending redisplays
+        checklist.app.mark_dirty()
         if await checklist.is_done():
             await checklist.app.close()
         
     @commands.Cog.listener()
     async def on_gapps_app_closed(self, app):
-        for nick, member in list(self.nickname_map[app.member.guild.id].items()):
+        for nick, member in list(self.nickname_map.get(app.member.guild.id, {}).items()):
             # compare ids cause MissingMember != Member atm maybe change that later :eyes:
             if member.id == app.member.id:
                 del self.nickname_map[app.member.guild.id][nick]
+        self.mention_matcher_for(app.guild).remove(app.member.id)
     
     @commands.Cog.listener()
     async def on_gapps_app_opened(self, app):
         nm = self.nickname_map.setdefault(app.member.guild.id, {})
-        for nick in await self.config.member(app.member).NICKNAMES():
+        nicknames = await self.config.member(app.member).NICKNAMES()
+        for nick in nicknames:
             nm[nick] = app.member
+        self.mention_matcher_for(app.guild).add(app.member, nicknames)
     
     @commands.Cog.listener()
     async def on_gapps_app_thread_set(self, app):
-        self.thread_member_map[app.thread] = app.member
+        self.thread_member_map[app.thread.id] = app.member
 
     @commands.Cog.listener()
     async def on_gapps_wufoo_entry_mapped(self, entries: List[Entry]):
@@ -428,12 +660,34 @@ class GenesisApps(commands.Cog):
             raise ValueError("Wufoo alert channel not set")
         await self.send_entry_queue_list(channel)
 
+    @commands.Cog.listener()
+    async def on_gapps_app_dirty(self, app: Application, delay: float = None):
+        self.display_queue_for(app.guild).push(app, delay)
+
     @commands.Cog.listener()
     async def on_gapps_trigger_app_display(self, app: Application):
-        await app.display()
+        app.mark_dirty()
+
+    @commands.Cog.listener()
+    async def on_thread_create(self, thread: discord.Thread):
+        self.thread_indexes.record_thread(thread)
+
+    @commands.Cog.listener()
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent):
+        self.thread_indexes.forget_thread(payload.thread_id, payload.parent_id)
+        member = self.thread_member_map.pop(payload.thread_id, None)
+        if member is None:
+            return
+        try:
+            app = self.application_for(member)
+        except KeyError:
+            return
+        if app.thread_id == payload.thread_id:
+            app.forget_thread()
 
     @commands.Cog.listener()
     async def on_thread_update(self, before: discord.Thread, after: discord.Thread):
+        self.thread_indexes.record_thread(after)
         # unarchive auto-archived threads
         if after.archived:
             try:
@@ -461,28 +715,7 @@ class GenesisApps(commands.Cog):
 
         # if in peer_review channel, check for mentions
         if message.channel.id == await self.config.guild(message.guild).PEER_REVIEW_CHANNEL():
-            members_to_check_for = [app.member for app in self.applications.get(message.guild.id, {}).values() if not app.closed]
-
-            mentions_map = {m.id: m for m in members_to_check_for}
-            if message.mentions:
-                members = set([m for m in message.mentions if m.id in mentions_map])
-            else:
-                members = set()
-
-            name_map = {m.name.lower(): m for m in members_to_check_for}
-            disp_map = {m.display_name.lower(): m for m in members_to_check_for}
-            nick_map = {nick.lower(): mem for nick, mem in self.nickname_map[message.guild.id].items() if mem in members_to_check_for}
-            the_map = {**nick_map, **name_map, **disp_map}
-
-            if not the_map:
-                return
-
-            sr = r"(^|\W)" + "(?P<find>"
-            er = ")" + r"($|\W)"
-            pattern = sr + "|".join([re.escape(n) for n in the_map]) + er
-            
-            for m in re.finditer(pattern, message.content.lower()):
-                members.add(the_map[m.group('find')])
+            members = self.mention_matcher_for(message.guild).find(message)
             
             for m in members:
                 app = await self.get_or_set_application_for(m, message.guild)
@@ -508,6 +741,42 @@ class GenesisApps(commands.Cog):
         if app.messages == 1:
             await app.display()
 
+    async def check_app(self, work):
+        guild_pass, app = work
+        guild = guild_pass.guild
+        member = self.get_member(guild, app.member.id)
+        # member is still in server
+        if isinstance(member, MissingMember):
+            return
+        # keep posts' archived state synchronized with app
+        if app.thread and (app.closed != app.thread.archived):
+            await app.thread.edit(archived=app.closed)
+        # check for auto-kicks
+        joined_before_autokick = guild_pass.joined_before_autokick
+        if joined_before_autokick:
+            joined_naive = datetime.fromtimestamp(member.joined_at.timestamp())
+            if (joined_naive < joined_before_autokick and 
+                (not await app.seen_activity()) and
+                not await self.config.member(member).AUTO_KICK_IMMUNITY()
+            ):
+                if not Application.is_exempt(member):
+                    if guild_pass.autokick_msg:
+                        try:
+                            await member.send(guild_pass.autokick_msg)
+                        except:
+                            pass
+                    await member.kick(reason="inactivity auto-kick")
+                    guild_pass.kicked.append(member)
+        # check for alarms
+        if guild_pass.new_day and (not Application.is_exempt(member)) and not app.closed:
+            await app.check_and_alarm()
+
+        if guild_pass.new_hour:
+            try:
+                await app.check_application_forms()
+            except AttributeError:
+                pass
+
     async def display_loop(self):
         
         day = 0
@@ -517,79 +786,75 @@ class GenesisApps(commands.Cog):
                 await asyncio.sleep(5)
                 continue
 
+            metrics = None
             try:
                 now = datetime.now()
                 prev_day = day
                 day = now.day
                 prev_hour = hour
                 hour = now.hour
-                for guild_id, apps in self.applications.items():
+
+                guild_passes = []
+                work = []
+                for guild_id, apps in list(self.applications.items()):
                     guild = self.bot.get_guild(guild_id)
                     if guild is None:
                         continue
 
-                    kicked = []
                     days_to_autokick = await self.config.guild(guild).DAYS_TO_KICK_IF_NO_ACTIVITY()
-                    joined_before_autokick = None
-                    if days_to_autokick:
-                        joined_before_autokick = now - timedelta(days=days_to_autokick)
-                    autokick_msg = await self.config.guild(guild).INACTIVITY_KICK_MSG()
-
-                    for member_id, app in apps.items():
-                        # check roles
-                        member = self.get_member(guild, member_id)
-                        await app.checklist.update_roles(member)
-                        # check if needs displaying
-                        if app.update:
-                            await app.display()
-                        # member is still in server
-                        if not isinstance(member, MissingMember):
-                            # keep posts' archived state synchronized with app
-                            if app.thread and (app.closed != app.thread.archived):
-                                await app.thread.edit(archived=app.closed)
-                            # check for auto-kicks
-                            if joined_before_autokick:
-                                joined_naive = datetime.fromtimestamp(member.joined_at.timestamp())
-                                if (joined_naive < joined_before_autokick and 
-                                    (not await app.seen_activity()) and
-                                    not await self.config.member(member).AUTO_KICK_IMMUNITY()
-                                ):
-                                    if not await Application.app_exempt(self.config, member):
-                                        if autokick_msg:
-                                            try:
-                                                await member.send(autokick_msg)
-                                            except:
-                                                pass
-                                        await member.kick(reason="inactivity auto-kick")
-                                        kicked.append(member)
-                            # check for alarms
-                            if prev_day != day and (not await Application.app_exempt(self.config, member)) and not app.closed:
-                                await app.check_and_alarm()
-
-                            if prev_hour != hour:
-                                try:
-                                    await app.check_application_forms()
-                                except AttributeError:
-                                    pass
+                    guild_pass = GuildPass(
+                        guild,
+                        new_day=prev_day != day,
+                        new_hour=prev_hour != hour,
+                        joined_before_autokick=now - timedelta(days=days_to_autokick) if days_to_autokick else None,
+                        autokick_msg=await self.config.guild(guild).INACTIVITY_KICK_MSG(),
+                    )
+                    guild_passes.append(guild_pass)
+                    work += [(guild_pass, app) for app in list(apps.values())]
+
+                # role items are ticked for the whole guild at once, and only for applicants whose roles may have changed
+                for guild_pass in guild_passes:
+                    guild = guild_pass.guild
+                    reconciler = self.role_reconciler_for(guild)
+                    if guild_pass.new_hour:
+                        # in case a role change event was missed
+                        reconciler.mark_all()
+                    await reconciler.run(self.applications.get(guild.id, {}))
+
+                metrics = await self.scheduler.run_pass(work, self.check_app)
+
+                for guild_pass in guild_passes:
+                    kicked = guild_pass.kicked
                     if kicked:
+                        guild = guild_pass.guild
                         cid = await self.config.guild(guild).WUFOO_ALERT_CHANNEL()
                         channel = guild.get_channel(cid)
                         if channel:
                             await channel.send(f"-# **Kicked due to inactivity:** {', '.join([m.mention for m in kicked])}")
-                if prev_hour != hour:
-                    for gid, wapi in self.wufoo_apis.items():
-                        await wapi.pull_entries()
-                    
-                        
             except Exception as e:
                 log.error("Error in display loop", exc_info=e)
-            await asyncio.sleep(60*10)
+            # don't let passes that run long eat into the next pass's wait
+            elapsed = metrics.duration if metrics else 0
+            await asyncio.sleep(max(60, DISPLAY_LOOP_INTERVAL - elapsed))
 
     @commands.group(aliases=["gapps"])
     @checks.mod_or_permissions(manage_guild=True)
     async def genesisapps(self, ctx: commands.Context) -> None:
         """GenesisApps setup commands"""
 
+    @genesisapps.command()
+    async def loopstats(self, ctx: commands.Context) -> None:
+        """Show timing metrics for the most recent application check passes"""
+        sched = self.scheduler
+        s = f"**Application check passes** (concurrency {sched.concurrency}, shard size {sched.shard_size})\n"
+        if sched.current:
+            s += f"-# Pass in progress since <t:{int(sched.current.started.timestamp())}:R>, {len(sched.current.shard_durations)} shards done\n"
+        if not sched.history:
+            s += "No passes completed yet"
+        s += "\n".join(f"-# {m}" for m in reversed(sched.history))
+        for p in pagify(s):
+            await ctx.send(p)
+
     @genesisapps.command()
     async def autokick(self, ctx: commands.Context, days: int) -> None:
         """Set the number of days of no activity before a user is auto-kicked.
@@ -650,6 +915,7 @@ class GenesisApps(commands.Cog):
         """Set the role to be exempt from the application process. 
         This is usually the role that would be used to mark that the application is complete"""
         await self.config.guild(ctx.guild).APPLICATION_EXEMPT_ROLE.set(role.id)
+        Exemptions.for_guild(ctx.guild.id).role_id = role.id
         await ctx.send(f"Exempt role is set to {role.mention}")
 
     @genesisapps.command()
@@ -709,7 +975,7 @@ class GenesisApps(commands.Cog):
             await ctx.send("Canceling")
             return
 
-        thread = await get_thread(forum, thread_id)
+        thread = await get_thread(forum, thread_id, self.thread_indexes)
         app = await self.get_or_set_application_for(member_or_member_id)
         await app.close()
         deleted = "thread and data"
@@ -724,9 +990,12 @@ class GenesisApps(commands.Cog):
                 return
         
         await self.config.guild(ctx.guild).APP_MEMBERS.clear_raw(f"{member_or_member_id.id}")
+        app.state.discard()
         await mconf.clear()
+        Exemptions.for_guild(ctx.guild.id).set_manual(member_or_member_id.id, False)
         await self.wufoo_apis[ctx.guild.id].db.delete_member_from_member_map(member_or_member_id)        
         del self.applications[ctx.guild.id][member_or_member_id.id]
+        self.role_reconciler_for(ctx.guild).untrack(member_or_member_id.id)
         try:
             await ctx.send(f"Application {deleted} deleted")
         except NotFound:
@@ -878,7 +1147,7 @@ class GenesisApps(commands.Cog):
             mention = "@everyone"
         await ctx.send(f"Mention role is set to {mention}")
 
-    @genesisapps.command()
+    @genesisapps.group(invoke_without_command=True)
     async def wufoo(self, ctx: commands.Context, form_url: str=None) -> None:
         """Setup Wufoo-related settings
         
@@ -888,7 +1157,13 @@ class GenesisApps(commands.Cog):
             await self.config.guild(ctx.guild).WUFOO_API_KEY.set(None)
             await self.config.guild(ctx.guild).WUFOO_DISCORD_USERNAME_FIELD.set(None)
             await self.config.guild(ctx.guild).WUFOO_ALERT_CHANNEL.set(None)
-            del self.wufoo_apis[ctx.guild.id]
+            await self.config.guild(ctx.guild).WUFOO_HIGH_WATER_MARK.set(0)
+            await self.config.guild(ctx.guild).WUFOO_INCOMPLETE_ENTRIES.clear()
+            await self.config.guild(ctx.guild).WUFOO_FORM_SCHEMA.set(None)
+            self.wufoo_apis.pop(ctx.guild.id, None)
+            self.wufoo_poller.states.pop(ctx.guild.id, None)
+            await self.config.guild(ctx.guild).WUFOO_WEBHOOK_KEY.set(None)
+            self.webhook_keys.pop(ctx.guild.id, None)
             await ctx.send("Wufoo integration has been unset")
             return
         
@@ -929,11 +1204,109 @@ class GenesisApps(commands.Cog):
 
         await self.config.guild(ctx.guild).WUFOO_API_KEY.set(key)
         await self.config.guild(ctx.guild).WUFOO_DISCORD_USERNAME_FIELD.set(discord_username_field)
+        if form_url != await self.config.guild(ctx.guild).WUFOO_FORM_URL():
+            await self.wufoo_apis[ctx.guild.id].db.set_high_water_mark(0)
+            await self.wufoo_apis[ctx.guild.id].db.clear_incomplete()
         await self.config.guild(ctx.guild).WUFOO_FORM_URL.set(form_url)
         await self.config.guild(ctx.guild).WUFOO_ALERT_CHANNEL.set(ctx.channel.id)
         await author.send("Wufoo settings have been updated")
         await ctx.send("Wufoo settings have been updated. Messages will be sent to this channel if a matching user can't be found for an application submitted")
 
+    @wufoo.command(name="import")
+    async def wufoo_import(self, ctx: commands.Context, filename: str=None) -> None:
+        """Bulk load applications from a JSON lines file made by `[p]gapps wufoo export`
+
+        Attach the file or give the name of a file in the cog's data folder.
+        Applications that are already known are skipped. Linked applications aren't reposted to their threads"""
+        if ctx.guild.id not in self.wufoo_apis:
+            await ctx.send("Please set up the Wufoo integration first")
+            return
+        if ctx.message.attachments:
+            path = cog_data_path(self) / f"wufoo_import_{ctx.guild.id}.jsonl"
+            await ctx.message.attachments[0].save(path)
+        elif filename:
+            path = cog_data_path(self) / filename
+            if path.parent != cog_data_path(self) or not path.is_file():
+                await ctx.send(f"Could not find `{filename}` in the cog's data folder")
+                return
+        else:
+            await ctx.send("Please attach a file or give a file name")
+            return
+
+        wapi = self.wufoo_apis[ctx.guild.id]
+        db = wapi.db
+        msg = await ctx.send("Importing applications...")
+        added = queued = 0
+        newest = 0  # newest entry id of this guild's form, other forms' entry ids don't count for the mark
+        try:
+            with open(path) as f:
+                chunk = []
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if wapi.form_hash and record.get('form') == wapi.form_hash:
+                        newest = max(newest, int(record['key']))
+                    chunk.append(record)
+                    if len(chunk) >= IMPORT_CHUNK_SIZE:
+                        a, q = db.import_records(chunk)
+                        added, queued, chunk = added + a, queued + q, []
+                        await asyncio.sleep(0)
+                a, q = db.import_records(chunk)
+                added, queued = added + a, queued + q
+        except (ValueError, KeyError, TypeError) as e:
+            log.error("Failed to import Wufoo entries", exc_info=e)
+            await msg.edit(content=f"Stopped at a malformed line after importing {added} applications")
+            return
+        finally:
+            db.build_indexes()
+        if newest > db.high_water_mark:
+            await db.set_high_water_mark(newest)
+        await msg.edit(content=f"Imported {added} applications, {queued} of them unlinked")
+        if queued:
+            self.bot.dispatch("gapps_wufoo_entry_queued", db)
+
+    @wufoo.command(name="export")
+    async def wufoo_export(self, ctx: commands.Context) -> None:
+        """Save every application to a JSON lines file that `[p]gapps wufoo import` can load"""
+        if ctx.guild.id not in self.wufoo_apis:
+            await ctx.send("Please set up the Wufoo integration first")
+            return
+        wapi = self.wufoo_apis[ctx.guild.id]
+        db = wapi.db
+        path = cog_data_path(self) / f"wufoo_export_{ctx.guild.id}.jsonl"
+        with open(path, 'w') as f:
+            for i, record in enumerate(db.export_records(wapi.form_hash)):
+                f.write(json.dumps(record) + "\n")
+                if i % IMPORT_CHUNK_SIZE == 0:
+                    await asyncio.sleep(0)
+        if path.stat().st_size < ctx.guild.filesize_limit:
+            await ctx.send(f"Exported {len(db.entries)} applications", file=discord.File(path))
+        else:
+            await ctx.send(f"Exported {len(db.entries)} applications to `{path.name}` in the cog's data folder")
+
+    @genesisapps.command()
+    @checks.is_owner()
+    async def webhookport(self, ctx: commands.Context, port: int=None, host: str=None) -> None:
+        """Set the port the Wufoo webhook receiver listens on. Leave blank to turn it off
+
+        Wufoo needs to be able to reach this port, e.g. through a reverse proxy"""
+        if port is None:
+            await self.config.WEBHOOK_PORT.set(None)
+            await self.webhook.stop()
+            await ctx.send("Wufoo webhook receiver has been turned off")
+            return
+        if host is not None:
+            await self.config.WEBHOOK_HOST.set(host)
+        host = await self.config.WEBHOOK_HOST()
+        try:
+            await self.webhook.start(host, port)
+        except OSError as e:
+            await ctx.send(f"Could not listen on {host}:{port}: {e}")
+            return
+        await self.config.WEBHOOK_PORT.set(port)
+        await ctx.send(f"Wufoo webhook receiver is listening on {host}:{port}")
+
     @commands.group(name="wufoo")
     @checks.mod_or_permissions(manage_guild=True)
     async def _wufoo(self, ctx: commands.Context) -> None:
@@ -955,14 +1328,9 @@ class GenesisApps(commands.Cog):
             return
         
         cl = Checklist(self.config.guild(ctx.guild).CHECKLIST_TEMPLATE, self.bot, ctx.guild)
-        to_highlights = []
-        for c in await cl.checklist_items():
-            ci_title = str(c.value).lower()
-            if ci_title.startswith(('used', 'contains')):
-                to_find = ci_title.split(' ', 1)[-1]
-                to_highlights.append(to_find)
-
-        for e in entry.embeds(to_highlights):
+        highlighter = Highlighter.for_terms(highlight_term(str(c.value)) for c in await cl.checklist_items())
+
+        for e in entry.embeds(highlighter):
             await ctx.send(embed=e)
 
     @_wufoo.command()
@@ -1062,8 +1430,59 @@ class GenesisApps(commands.Cog):
     async def check(self, ctx: commands.Context) -> None:
         """Check for new applications. Note, this shouldn't be used too often as we can only make 100 accesses to the API a day"""
         msg = await ctx.send("Checking Wufoo for more applications...")
-        await self.wufoo_apis[ctx.guild.id].pull_entries()
+        try:
+            await self.wufoo_poller.poll(ctx.guild.id)
+        except RateLimited:
+            await msg.edit(content="Wufoo is rate limiting requests right now. It will be retried automatically")
+            return
         await msg.edit(content="Done")
+
+    @_wufoo.command()
+    async def resync(self, ctx: commands.Context) -> None:
+        """Re-download every application from Wufoo instead of just the new ones.
+        
+        Applications that were already pulled are left alone. This uses more API accesses than `[p]wufoo check`"""
+        msg = await ctx.send("Resyncing all applications from Wufoo...")
+        try:
+            await self.wufoo_poller.poll(ctx.guild.id, full=True)
+        except RateLimited:
+            await msg.edit(content="Wufoo is rate limiting requests right now. Entries pulled so far were kept, please try again later")
+            return
+        await msg.edit(content="Done")
+
+    @_wufoo.command()
+    async def webhook(self, ctx: commands.Context) -> None:
+        """Get a handshake key for Wufoo's Entry Submitted webhook so new applications come in right away
+
+        Running this again replaces the key"""
+        if ctx.guild.id not in self.wufoo_apis:
+            await ctx.send("Please set up the Wufoo integration first")
+            return
+        key = secrets.token_urlsafe(24)
+        # only replace the key once it was delivered, so a failed DM doesn't break the current webhook
+        try:
+            await ctx.author.send(
+                f"In your Wufoo form's Notifications, add a WebHook pointing to `/wufoo/{ctx.guild.id}` "
+                f"on the bot's webhook address with this handshake key:\n`{key}`"
+            )
+        except discord.Forbidden:
+            await ctx.send("I couldn't DM you the handshake key. Please allow DMs from this server and try again")
+            return
+        await self.config.guild(ctx.guild).WUFOO_WEBHOOK_KEY.set(key)
+        self.webhook_keys[ctx.guild.id] = key
+        msg = "A handshake key has been sent to you in a DM."
+        if not self.webhook.running:
+            msg += " Note that the webhook receiver isn't running. The bot owner can turn it on with `[p]gapps webhookport`"
+        await ctx.send(msg)
+
+    @_wufoo.command()
+    async def status(self, ctx: commands.Context) -> None:
+        """Show when applications were last pulled from Wufoo"""
+        if ctx.guild.id not in self.wufoo_apis:
+            await ctx.send("Wufoo integration isn't set up")
+            return
+        state = self.wufoo_poller.state_for(ctx.guild.id)
+        await ctx.send(f"**Wufoo sync:** {state}")
     
     @commands.group(aliases=["apps", "app"])
     @checks.mod_or_permissions(manage_guild=True)
@@ -1111,9 +1530,10 @@ class GenesisApps(commands.Cog):
         """Toggle a user's exemption to the application process. 
         Users that are exempt are still tracked, but their application thread isn't updated
         and no actions are taken based on their application"""
-        role_found = await Application.has_exempt_role(self.config, member)
+        await Application.app_exempt(self.config, member)  # make sure the guild's exemptions are loaded
+        role_found = Application.has_exempt_role(member)
         
-        exempt = not await Application.has_manual_exempt(self.config, member)
+        exempt = not Application.has_manual_exempt(member)
         await Application.set_manual_exempt(self.config, member, exempt)
         if exempt:
             await ctx.send(f"{member.mention} is now exempt from the application process")
@@ -1,10 +1,63 @@
 import discord
 import itertools
-from async_lru import alru_cache
-
-
-CONTAINS_PRE = r"(?P<word>(^|\W)"
-CONTAINS_POST = r"(\W|$))"
+import re
+from functools import lru_cache
+from typing import Iterable, Optional, Set, Tuple
+
+from .threadindex import ThreadIndexes
+
+
+def highlight_term(checklist_title: str) -> Optional[str]:
+    """The word a "used ..."/"contains ..." checklist item looks for in applications"""
+    title = checklist_title.lower()
+    if title.startswith(('used', 'contains')):
+        return title.split(' ', 1)[-1]
+    return None
+
+
+class Highlighter:
+    """Finds and bolds a set of whole-word terms in one pass over the text.
+
+    Get one with `for_terms`. Highlighters are cached per set of terms, so
+    the patterns only get rebuilt when a guild's checklist changes"""
+    def __init__(self, terms: Tuple[str, ...]):
+        self.terms = terms
+        if terms:
+            # longest first so that terms containing other terms get bolded whole
+            alts = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+            self.pattern = re.compile(r"(?<!\w)(?:" + alts + r")(?!\w)", re.IGNORECASE)
+            # finding is a lookahead so terms overlapping an earlier match are still found
+            self.finder = re.compile(r"(?<!\w)(?=(" + alts + r")(?!\w))", re.IGNORECASE)
+            # terms found at the same spot as a longer term, which the lookahead only reports once
+            self.contained = {
+                t: [s for s in terms if s != t and re.search(r"(?<!\w)" + re.escape(s) + r"(?!\w)", t)]
+                for t in terms
+            }
+        else:
+            self.pattern = None
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _for_terms(terms: Tuple[str, ...]) -> "Highlighter":
+        return Highlighter(terms)
+
+    @classmethod
+    def for_terms(cls, terms: Iterable[str]) -> "Highlighter":
+        return cls._for_terms(tuple(sorted(set(t.lower() for t in terms if t))))
+
+    def find(self, text: str) -> Set[str]:
+        if self.pattern is None:
+            return set()
+        found = set(m.group(1).lower() for m in self.finder.finditer(text))
+        for t in list(found):
+            found.update(self.contained.get(t, ()))
+        return found
+
+    def highlight(self, text: str) -> Tuple[str, Set[str]]:
+        """Returns the text with every term bolded and underlined, and the terms that were found"""
+        if self.pattern is None:
+            return text, set()
+        return self.pattern.sub(lambda m: f"__**{m.group(0)}**__", text), self.find(text)
 
 
 # can't inherit from discord.Member cause trying to set id gives an error
@@ -32,6 +85,31 @@ class MissingMember(object):
         return str(self)
 
 
+class MemberNameIndex:
+    """Name lookups for a snapshot of a guild's members that give the same
+    results as `guild.get_member_named` without scanning every member per lookup"""
+    def __init__(self, members: Iterable[discord.Member]):
+        self.names = {}  # nick, global name or username -> first member with it
+        self.discrims = {}  # (username, discriminator) -> first member
+        for m in members:
+            for name in (m.nick, m.global_name, m.name):
+                if name is not None:
+                    self.names.setdefault(name, m)
+            self.discrims.setdefault((m.name, m.discriminator), m)
+
+    @classmethod
+    def for_guild(cls, guild: discord.Guild) -> "MemberNameIndex":
+        return cls(guild.members)
+
+    def get_member_named(self, name: str) -> Optional[discord.Member]:
+        username, _, discriminator = name.rpartition('#')
+        if not username:
+            discriminator, username = username, discriminator
+        if discriminator == '0' or (len(discriminator) == 4 and discriminator.isdigit()):
+            return self.discrims.get((username, discriminator))
+        return self.names.get(name)
+
+
 class IterCache(object):
     def __init__(self, iterable):
         self.iterable = iterable
@@ -53,6 +131,20 @@ class IterCache(object):
         self.done = True
 
 
+def stream_pages(parts: Iterable[str], delims=('\n\n', '\n', ' '), page_length: int=1900):
+    """Like pagify with priority delims, but pages chunks as they come instead of one big string"""
+    buf = ""
+    for part in parts:
+        buf += part
+        while len(buf) > page_length:
+            cut = next((i for i in (buf.rfind(d, 1, page_length) for d in delims) if i > 0), page_length)
+            page, buf = buf[:cut], buf[cut:]
+            if page.strip():
+                yield page
+    if buf.strip():
+        yield buf
+
+
 # https://stackoverflow.com/a/19504173
 class AsyncAsYouGoCachingIterable:
     def __init__(self, async_iterable):
@@ -93,18 +185,10 @@ class _AsyncCachingIterator:
             raise
 
 
-@alru_cache(maxsize=128, ttl=1200)
-async def forum_cached_archived_threads(forum):
-    return AsyncAsYouGoCachingIterable(forum.archived_threads())
-
-
-async def get_thread(forum, thread_id):
-    thread = forum.get_thread(thread_id)
-    if thread is None:
-        async for t in await forum_cached_archived_threads(forum): 
-            if t.id == thread_id:
-                return t
-    return thread
+async def get_thread(forum, thread_id, indexes: ThreadIndexes):
+    if thread_id is None:
+        return None
+    return await indexes.for_forum(forum).get(forum, thread_id)
 
 
 def role_mention(role):
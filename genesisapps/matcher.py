@@ -0,0 +1,77 @@
+import discord
+
+import re
+from typing import Iterable, Set
+
+
+class MentionMatcher:
+    """Finds open applicants mentioned in a message by mention, name, display name or nickname.
+
+    The name lookup and compiled pattern are only rebuilt when the set of
+    tracked members or their names change, not for every message."""
+    def __init__(self):
+        self.members = {}  # member id -> member
+        self.nicknames = {}  # member id -> [nickname]
+        self._name_map = None
+        self._pattern = None
+
+    def __contains__(self, member_id: int):
+        return member_id in self.members
+
+    def __len__(self):
+        return len(self.members)
+
+    def _invalidate(self):
+        self._name_map = None
+        self._pattern = None
+
+    def add(self, member, nicknames: Iterable[str] = ()):
+        self.members[member.id] = member
+        self.nicknames[member.id] = [n.lower() for n in nicknames]
+        self._invalidate()
+
+    def remove(self, member_id: int):
+        if self.members.pop(member_id, None) is not None:
+            self.nicknames.pop(member_id, None)
+            self._invalidate()
+
+    def update_member(self, member):
+        if member.id in self.members:
+            self.members[member.id] = member
+            self._invalidate()
+
+    def set_nicknames(self, member_id: int, nicknames: Iterable[str]):
+        if member_id in self.members:
+            self.nicknames[member_id] = [n.lower() for n in nicknames]
+            self._invalidate()
+
+    def _build(self):
+        nick_map = {
+            nick: self.members[mid]
+            for mid, nicks in self.nicknames.items() for nick in nicks
+        }
+        name_map = {}
+        disp_map = {}
+        for m in self.members.values():
+            # MissingMembers don't have names
+            if (name := getattr(m, 'name', None)):
+                name_map[name.lower()] = m
+            if (display_name := getattr(m, 'display_name', None)):
+                disp_map[display_name.lower()] = m
+        self._name_map = {**nick_map, **name_map, **disp_map}
+        if self._name_map:
+            # longest first so that names containing other names win
+            names = sorted(self._name_map, key=len, reverse=True)
+            self._pattern = re.compile(r"(?<!\w)(?P<find>" + "|".join(re.escape(n) for n in names) + r")(?!\w)")
+        else:
+            self._pattern = None
+
+    def find(self, message: discord.Message) -> Set:
+        members = set(self.members[m.id] for m in message.mentions if m.id in self.members)
+        if self._name_map is None:
+            self._build()
+        if self._pattern is None:
+            return members
+        for m in self._pattern.finditer(message.content.lower()):
+            members.add(self._name_map[m.group('find')])
+        return members
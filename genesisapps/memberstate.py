@@ -0,0 +1,55 @@
+from redbot.core.config import Group
+
+import asyncio
+from typing import Any
+
+
+class MemberState:
+    """Write-behind buffer for frequently changing member config fields.
+
+    Values are kept in memory and marked dirty when set. Dirty fields are
+    written back to config, and only those fields, when `flush` is called."""
+    def __init__(self, config_group: Group):
+        self.config = config_group
+        self.values = {}
+        self.dirty = set()
+        self.lock = asyncio.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+    def set(self, key: str, value: Any):
+        self.values[key] = value
+        self.dirty.add(key)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.values[key]
+
+    def __setitem__(self, key: str, value: Any):
+        self.set(key, value)
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self.dirty)
+
+    def discard(self):
+        """Forget any pending writes. Used when the member's data is being cleared"""
+        self.dirty.clear()
+
+    async def flush(self):
+        if not self.dirty:
+            return
+        async with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            if not dirty:
+                return
+            # only write the fields this buffer owns so writes made elsewhere to the
+            # member's other fields aren't overwritten
+            for key in list(dirty):
+                try:
+                    await self.config.get_attr(key).set(self.values[key])
+                except Exception:
+                    # try again on the next flush
+                    self.dirty |= dirty
+                    raise
+                dirty.discard(key)
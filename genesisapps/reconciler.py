@@ -0,0 +1,85 @@
+import discord
+
+from typing import Dict, List
+
+from .checklist import ChecklistItem
+from .log import log
+
+
+class RoleReconciler:
+    """Ticks applicants' role checklist items once they have the role.
+
+    Keeps a role -> applicants index of role items that aren't done yet and
+    only looks at applicants that were marked since the last pass, so a pass
+    where no roles changed doesn't do anything"""
+    def __init__(self, guild: discord.Guild):
+        self.guild = guild
+        self.role_members: Dict[int, set] = {}  # role id -> {member id} with that item not done
+        self.member_roles: Dict[int, set] = {}  # member id -> {role id}, reverse of role_members
+        self.dirty = set()  # member ids whose roles may have changed since the last pass
+
+    def __len__(self):
+        return len(self.member_roles)
+
+    def untrack(self, member_id: int):
+        for rid in self.member_roles.pop(member_id, ()):
+            mids = self.role_members.get(rid)
+            if mids is not None:
+                mids.discard(member_id)
+                if not mids:
+                    del self.role_members[rid]
+        self.dirty.discard(member_id)
+
+    def track(self, app):
+        """(Re)index an application's role items that aren't done yet"""
+        mid = app.member.id
+        self.untrack(mid)
+        rids = set(
+            ci.value for ci in app.checklist.items
+            if ci.type == ChecklistItem.ROLE and not ci.done
+        )
+        if not rids:
+            return
+        self.member_roles[mid] = rids
+        for rid in rids:
+            self.role_members.setdefault(rid, set()).add(mid)
+        self.dirty.add(mid)
+
+    def mark_all(self):
+        self.dirty = set(self.member_roles)
+
+    def mark(self, member_id: int):
+        if member_id in self.member_roles:
+            self.dirty.add(member_id)
+
+    def gained(self) -> Dict[int, List[int]]:
+        """member id -> pending role ids the member now has, for marked members"""
+        dirty, self.dirty = self.dirty, set()
+        gained = {}
+        for rid, mids in self.role_members.items():
+            for mid in mids & dirty:
+                member = self.guild.get_member(mid)
+                if member is not None and member.get_role(rid) is not None:
+                    gained.setdefault(mid, []).append(rid)
+        return gained
+
+    async def run(self, apps: dict) -> int:
+        """Apply one pass. `apps` is the guild's member id -> Application map.
+        Returns how many applicants had items ticked"""
+        if not self.dirty:
+            return 0
+        gained = self.gained()
+        for mid, rids in gained.items():
+            app = apps.get(mid)
+            if app is None:
+                self.untrack(mid)
+                continue
+            try:
+                await app.checklist.complete_roles(rids)
+            except Exception as e:
+                log.error(f"Failed to update checklist roles for {app.member}", exc_info=e)
+                self.dirty.add(mid)
+                continue
+            self.track(app)
+            self.dirty.discard(mid)
+        return len(gained)
@@ -0,0 +1,74 @@
+import asyncio
+from collections import deque
+from datetime import datetime
+from time import monotonic
+from typing import Awaitable, Callable, Iterable, List
+
+from .log import log
+
+
+# discord.py handles per-route rate-limits for us, but having too many requests
+# in flight at once just piles them up behind its buckets
+DEFAULT_CONCURRENCY = 8
+DEFAULT_SHARD_SIZE = 50
+
+
+class PassMetrics:
+    def __init__(self):
+        self.started = datetime.now()
+        self.duration = 0.0
+        self.items = 0
+        self.errors = 0
+        self.shard_durations: List[float] = []
+
+    @property
+    def slowest_shard(self):
+        return max(self.shard_durations, default=0.0)
+
+    def __str__(self):
+        return (
+            f"<t:{int(self.started.timestamp())}:R>: {self.items} apps in "
+            f"{len(self.shard_durations)} shards, {self.duration:.2f}s "
+            f"(slowest shard {self.slowest_shard:.2f}s), {self.errors} errors"
+        )
+
+
+class ShardedScheduler:
+    """Runs per-item work in shards with bounded concurrency and records
+    timing metrics for each pass."""
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, shard_size: int = DEFAULT_SHARD_SIZE, history: int = 10):
+        self.concurrency = concurrency
+        self.shard_size = shard_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.history = deque(maxlen=history)
+        self.current: PassMetrics = None
+
+    @property
+    def last_pass(self):
+        return self.history[-1] if self.history else None
+
+    def shards(self, items: list):
+        for i in range(0, len(items), self.shard_size):
+            yield items[i:i + self.shard_size]
+
+    async def _run(self, work: Callable[..., Awaitable], item):
+        async with self.semaphore:
+            return await work(item)
+
+    async def run_pass(self, items: Iterable, work: Callable[..., Awaitable]) -> PassMetrics:
+        items = list(items)
+        metrics = self.current = PassMetrics()
+        metrics.items = len(items)
+        start = monotonic()
+        for shard in self.shards(items):
+            shard_start = monotonic()
+            results = await asyncio.gather(*[self._run(work, item) for item in shard], return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    metrics.errors += 1
+                    log.error("Error in scheduled work", exc_info=result)
+            metrics.shard_durations.append(monotonic() - shard_start)
+        metrics.duration = monotonic() - start
+        self.history.append(metrics)
+        self.current = None
+        return metrics
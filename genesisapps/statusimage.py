@@ -1,8 +1,44 @@
+import discord
 from redbot.core.data_manager import cog_data_path
 
+import io
+import os
 from pathlib import Path
 
 
+class StatusImageCache:
+    """Process-wide cache of status image bytes keyed by path and mtime.
+
+    Each lookup only stats the file, it's read again when its mtime changed,
+    so steady-state displays don't read the disk and images replaced by hand
+    are still picked up"""
+    images = {}  # path -> (mtime, bytes)
+
+    @classmethod
+    def _load(cls, path: str):
+        mtime = os.path.getmtime(path)
+        cached = cls.images.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'rb') as f:
+                cls.images[path] = cached = (mtime, f.read())
+        return cached
+
+    @classmethod
+    def mtime(cls, path: str) -> float:
+        try:
+            return cls._load(path)[0]
+        except OSError:
+            return 0
+
+    @classmethod
+    def file(cls, path: str) -> discord.File:
+        return discord.File(io.BytesIO(cls._load(path)[1]), filename=os.path.basename(path))
+
+    @classmethod
+    def invalidate(cls, path: str):
+        cls.images.pop(path, None)
+
+
 class StatusImage:
     def __init__(self, cog, guild, config, status):
         self.guild = guild
@@ -27,8 +63,11 @@ class StatusImage:
 
     async def set(self, attachment):
         ext = attachment.filename.split('.')[-1]
+        if getattr(self, 'path', None):
+            StatusImageCache.invalidate(self.path)
         self.path = str(self.BASE_PATH / f"{self.status}.{ext}")
         await attachment.save(self.path)
+        StatusImageCache.invalidate(self.path)
         await self.config.guild(self.guild).STATUS_IMAGES.set_raw(self.status, value=self.path)
 
     def __str__(self):
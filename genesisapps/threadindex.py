@@ -0,0 +1,144 @@
+import discord
+from discord.errors import NotFound, Forbidden
+
+import asyncio
+import json
+from time import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from .log import log
+
+
+class ThreadIndexes:
+    """The thread indexes of every forum, saved together to one JSON file.
+
+    Changes only mark the indexes dirty. `save` is called from the cog's
+    flush loop and on unload, and writes the file in an executor"""
+    def __init__(self, path: Path):
+        self.path = path
+        self.indexes: Dict[int, ThreadIndex] = {}  # forum id -> ThreadIndex
+        self.dirty = False
+
+    def load(self):
+        self.indexes = {}
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log.error("Failed to load thread index. It will be rebuilt", exc_info=e)
+            return
+        for fid, idx in data.items():
+            self.indexes[int(fid)] = ThreadIndex(
+                self, int(fid), {int(tid): meta for tid, meta in idx['threads'].items()}, idx.get('complete_until')
+            )
+
+    def _write(self, data: dict):
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        tmp.replace(self.path)
+
+    async def save(self):
+        if not self.dirty:
+            return
+        # copied here so the indexes can keep changing while the file is written.
+        # threads are recorded as they're created, so a scanned index has every thread up to now
+        now = time()
+        data = {
+            str(fid): {
+                'complete_until': now if idx.scanned else None,
+                'threads': {str(tid): dict(meta) for tid, meta in idx.threads.items()}
+            } for fid, idx in self.indexes.items()
+        }
+        self.dirty = False
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+        except OSError:
+            self.dirty = True
+            raise
+
+    def for_forum(self, forum: discord.ForumChannel) -> "ThreadIndex":
+        if forum.id not in self.indexes:
+            self.indexes[forum.id] = ThreadIndex(self, forum.id)
+        return self.indexes[forum.id]
+
+    def record_thread(self, thread: discord.Thread):
+        if thread.parent_id in self.indexes:
+            self.indexes[thread.parent_id].record(thread)
+
+    def forget_thread(self, thread_id: int, parent_id: int):
+        if parent_id in self.indexes:
+            self.indexes[parent_id].forget(thread_id)
+
+
+class ThreadIndex:
+    """Persistent thread id -> thread metadata index for a forum.
+
+    Kept up to date from thread events so that looking up an archived thread
+    doesn't mean paging through the forum's whole archive. Once scanned, ids
+    it doesn't know are only fetched if they're newer than the last save."""
+    def __init__(self, store: ThreadIndexes, forum_id: int, threads: dict=None, complete_until: float=None):
+        self.store = store
+        self.forum_id = forum_id
+        self.threads = threads or {}  # thread id -> metadata
+        # unix time up to which every thread of the forum is in `threads`. None until scanned
+        self.complete_until = complete_until
+        self.cache = {}  # thread id -> discord.Thread, not persisted
+        self.missing = set()  # thread ids that weren't found this session
+
+    @property
+    def scanned(self):
+        return self.complete_until is not None
+
+    def record(self, thread: discord.Thread):
+        meta = {'name': thread.name, 'archived': thread.archived}
+        self.cache[thread.id] = thread
+        self.missing.discard(thread.id)
+        if self.threads.get(thread.id) != meta:
+            self.threads[thread.id] = meta
+            self.store.dirty = True
+
+    def forget(self, thread_id: int):
+        self.cache.pop(thread_id, None)
+        self.missing.add(thread_id)
+        if self.threads.pop(thread_id, None) is not None:
+            self.store.dirty = True
+
+    async def scan(self, forum: discord.ForumChannel):
+        """Page through the forum's archive once to seed the index"""
+        started = time()
+        for thread in forum.threads:
+            self.record(thread)
+        async for thread in forum.archived_threads(limit=None):
+            self.record(thread)
+        self.complete_until = started
+        self.store.dirty = True
+
+    async def get(self, forum: discord.ForumChannel, thread_id: int) -> Optional[discord.Thread]:
+        thread = forum.get_thread(thread_id)
+        if thread is not None:
+            self.record(thread)
+            return thread
+        if thread_id in self.cache:
+            return self.cache[thread_id]
+        if thread_id in self.missing:
+            return None
+        if (thread_id not in self.threads and self.scanned and
+                discord.utils.snowflake_time(thread_id).timestamp() < self.complete_until):
+            # the index has every thread created before complete_until, so it isn't in this forum
+            self.missing.add(thread_id)
+            return None
+        # not in discord.py's cache so it's most likely archived. fetch just this one thread.
+        # ids the index doesn't know are fetched too if they're newer than what it's complete for
+        try:
+            thread = await forum.guild.fetch_channel(thread_id)
+        except (NotFound, Forbidden):
+            thread = None
+        if not isinstance(thread, discord.Thread) or thread.parent_id != forum.id:
+            self.forget(thread_id)
+            return None
+        self.record(thread)
+        return thread
@@ -0,0 +1,76 @@
+from aiohttp import web
+
+import hmac
+from typing import Callable, Mapping, Optional, Tuple
+
+from .wufoo import Wufoo, Entry
+from .log import log
+
+
+class WufooWebhook:
+    """Local endpoint for Wufoo's "Entry Submitted" webhook.
+
+    Wufoo POSTs each new entry to `/wufoo/<guild id>` as form data with the
+    same Field ids the API uses, so entries get into the db as soon as they're
+    submitted instead of waiting for the next poll. `receive` does the actual
+    work and doesn't depend on aiohttp, so recorded payloads can be fed to it directly"""
+    def __init__(self, get_wufoo: Callable[[int], Optional[Wufoo]], get_handshake_key: Callable[[int], Optional[str]]):
+        self.get_wufoo = get_wufoo
+        self.get_handshake_key = get_handshake_key
+        self.runner: web.AppRunner = None
+        self.port: int = None
+
+    @property
+    def running(self):
+        return self.runner is not None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/wufoo/{guild_id}", self.handle)
+        return app
+
+    async def start(self, host: str, port: int):
+        await self.stop()
+        self.runner = web.AppRunner(self.make_app())
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        self.port = port
+        log.info(f"Wufoo webhook listening on {host}:{port}")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+            self.port = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        try:
+            gid = int(request.match_info["guild_id"])
+        except ValueError:
+            return web.Response(status=404)
+        status, text = await self.receive(gid, await request.post())
+        return web.Response(status=status, text=text)
+
+    async def receive(self, gid: int, payload: Mapping) -> Tuple[int, str]:
+        """Ingest one webhook payload for a guild. Returns the http status and body to respond with"""
+        wapi = self.get_wufoo(gid)
+        key = self.get_handshake_key(gid)
+        if wapi is None or not key:
+            return 404, "unknown guild"
+        # compared as bytes, compare_digest refuses str with non-ASCII characters
+        if not hmac.compare_digest(str(payload.get("HandshakeKey", "")).encode(), key.encode()):
+            return 403, "bad handshake key"
+        try:
+            entry = self.parse(wapi, payload)
+        except (KeyError, ValueError) as e:
+            log.error(f"Malformed Wufoo webhook payload for guild {gid}", exc_info=e)
+            return 400, "malformed entry"
+        await wapi.db.new_entries(entry)
+        return 200, "ok"
+
+    @staticmethod
+    def parse(wapi: Wufoo, payload: Mapping) -> Entry:
+        # the webhook also sends FieldStructure/FormStructure and such. only keep the form's fields
+        fields = {k: v for k, v in payload.items() if k in wapi.fields}
+        fields["DateCreated"] = payload["DateCreated"]
+        return Entry.from_api(wapi, fields, wapi.db.guild)
@@ -1,16 +1,26 @@
 import discord
 
-from redbot.core.utils.chat_formatting import pagify
+from redbot.core.config import Group
+from redbot.core.utils.chat_formatting import escape
 
-from typing import List
+from typing import Dict, Iterable, List
 
 from pyfoo import PyfooAPI
 
 import tldextract
-from datetime import datetime
-import re
+from datetime import datetime, timedelta
+from time import monotonic
 
-from .helpers import int_to_emoji, CONTAINS_PRE, CONTAINS_POST
+from .helpers import int_to_emoji, Highlighter, IterCache, stream_pages, MemberNameIndex
+from .wufoostore import WufooStore
+
+
+# the most entries Wufoo will return in one request
+ENTRIES_PAGE_SIZE = 100
+# unfinished Save & Resume entries are rechecked by id until they're this old, then treated as abandoned
+INCOMPLETE_ENTRY_MAX_AGE = timedelta(days=30)
+INCOMPLETE_RECHECK_INTERVAL = 60*60*6  # seconds
+INCOMPLETE_IDS_PER_REQUEST = 10  # EntryId filters OR'd together in one request
 
 
 class FormNotFound(Exception):
@@ -25,6 +35,10 @@ class MemberNotFound(Exception):
     pass
 
 
+class RateLimited(Exception):
+    pass
+
+
 class Wufoo:
     def __init__(self, form_url: str, key: str, discord_name_field: str):
         self.username = tldextract.extract(form_url).subdomain
@@ -33,58 +47,251 @@ class Wufoo:
             form_url += "/"
         self.discord_name_field_title = discord_name_field
         self.api = PyfooAPI(self.username, key)
+        self.limiter = None  # the account's TokenBucket, set by the poller
+        self.form = None  # resolved lazily, see resolve_form
+        self.form_hash = None
+        self.form_updated = None  # the form's DateUpdated when fields were last fetched
+        self.incomplete_checked = 0.0  # monotonic time unfinished entries were last rechecked
+        self.fields: dict
+        self.discord_name_field: str
+        self.config: Group
         self.db: WufooDB
     
-    async def setup(self, bot, config, guild: discord.Guild):
+    async def setup(self, bot, config: Group, guild: discord.Guild, store: WufooStore, settings: dict=None, use_cached_schema: bool=False):
+        """Set use_cached_schema at startup to skip talking to Wufoo if a previous setup cached the form's schema.
+        Without it the form, api key and name field are checked against Wufoo"""
+        self.config = config
+        if settings is None:
+            settings = await config.all()
+        if not (use_cached_schema and self.load_schema(settings["WUFOO_FORM_SCHEMA"])):
+            await self.resolve_form()
+        self.db = await WufooDB.new(bot, config, guild, store, settings)
+
+    def load_schema(self, schema: dict) -> bool:
+        if (not schema or schema['form_url'] != self.form_url or 
+                schema['discord_name_field_title'] != self.discord_name_field_title):
+            return False
+        self.form_hash = schema['hash']
+        self.form_updated = schema['date_updated']
+        self.fields = schema['fields']
+        self.discord_name_field = schema['discord_name_field']
+        return True
+
+    async def save_schema(self):
+        await self.config.WUFOO_FORM_SCHEMA.set({
+            'form_url': self.form_url,
+            'discord_name_field_title': self.discord_name_field_title,
+            'hash': self.form_hash,
+            'date_updated': self.form_updated,
+            'fields': self.fields,
+            'discord_name_field': self.discord_name_field,
+        })
+
+    async def throttle(self):
+        if self.limiter:
+            await self.limiter.acquire()
+
+    async def resolve_form(self):
+        """Find the form and refetch its fields if it was updated since they were cached"""
+        await self.throttle()
         forms = await self.api.forms()
+        url = self.form_url.replace('http://', 'https://')
         for form in forms:
-            if form.get_link_url().replace('http://', 'https://') == self.form_url.replace('http://', 'https://'):
+            if (self.form_hash and getattr(form, 'Hash', None) == self.form_hash or 
+                    form.get_link_url().replace('http://', 'https://') == url):
                 self.form = form
                 break
-        if not hasattr(self, "form"):
+        else:
             raise FormNotFound(f"Could not find form for {self.form_url}")
-        await self.set_fields()
-        self.db = await WufooDB.new(bot, config, guild)
+        updated = getattr(self.form, 'DateUpdated', None)
+        if self.form_hash is None or updated is None or updated != self.form_updated:
+            await self.set_fields()
+            self.form_hash = getattr(self.form, 'Hash', None)
+            self.form_updated = updated
+            await self.save_schema()
 
     async def set_fields(self):
-        if hasattr(self, "fields"):
-            return self.fields
+        await self.throttle()
         flds = await self.form.fields()
-        self.fields = {}
+        fields = {}
+        discord_name_field = None
         for fld in flds:
-            self.fields[fld.ID] = fld.Title
+            fields[fld.ID] = fld.Title
             if fld.Title == self.discord_name_field_title:
-                self.discord_name_field = fld.ID
-        if not hasattr(self, "discord_name_field"):
+                discord_name_field = fld.ID
+        if discord_name_field is None:
             raise DiscordNameFieldNotFound(f"Could not find {self.discord_name_field_title} in {self.form_url}")
+        self.fields = fields
+        self.discord_name_field = discord_name_field
     
-    async def pull_entries(self):
-        try:
-            entries = await self.form.get_entries()
-        except AssertionError:  # ratelimit
-            return
+    async def refresh_fields(self):
+        await self.set_fields()
+        await self.save_schema()
+
+    async def get_entries_page(self, after: int, page: int):
+        params = {
+            'sort': 'EntryId',
+            'sortDirection': 'ASC',
+            'pageStart': page * ENTRIES_PAGE_SIZE,
+            'pageSize': ENTRIES_PAGE_SIZE,
+        }
+        if after:
+            params['Filter1'] = f"EntryId Is_greater_than {after}"
+        if self.form is None:
+            await self.resolve_form()
+        await self.throttle()
+        return await self.form.get_entries(**params)
+
+    async def get_entries_by_id(self, entry_ids: List[int]):
+        params = {'match': 'OR', 'pageSize': ENTRIES_PAGE_SIZE}
+        for i, eid in enumerate(entry_ids, 1):
+            params[f'Filter{i}'] = f"EntryId Is_equal_to {eid}"
+        if self.form is None:
+            await self.resolve_form()
+        await self.throttle()
+        return await self.form.get_entries(**params)
+
+    async def add_entries(self, entries: list, names: MemberNameIndex=None):
+        """Add the finished entries of a page to the db and track the unfinished ones"""
+        if entries and names is None:
+            names = MemberNameIndex.for_guild(self.db.guild)
+        # fields were added to the form since the schema was cached
+        if any(k.startswith('Field') and k not in self.fields for entry in entries for k in entry):
+            await self.refresh_fields()
         await self.db.new_entries(*[
-            Entry.from_api(self, entry, self.db.guild) for entry in entries
+            Entry.from_api(self, entry, self.db.guild, names) for entry in entries
             if entry['CompleteSubmission'] == '1'
         ])
+        cutoff = datetime.now() - INCOMPLETE_ENTRY_MAX_AGE
+        await self.db.set_incomplete(
+            {
+                int(e['EntryId']): e['DateCreated'] for e in entries
+                if e['CompleteSubmission'] != '1' and datetime.fromisoformat(e['DateCreated']) >= cutoff
+            },
+            done=[int(e['EntryId']) for e in entries if e['CompleteSubmission'] == '1'],
+        )
+        return names
+
+    async def recheck_incomplete(self):
+        """Fetch the unfinished entries by id to see whether they were finished.
+        Returns the number of entries fetched"""
+        cutoff = datetime.now() - INCOMPLETE_ENTRY_MAX_AGE
+        abandoned = [eid for eid, created in self.db.incomplete.items() if datetime.fromisoformat(created) < cutoff]
+        if abandoned:
+            await self.db.set_incomplete({}, done=abandoned)
+        ids = sorted(self.db.incomplete)
+        fetched = 0
+        names = None
+        for i in range(0, len(ids), INCOMPLETE_IDS_PER_REQUEST):
+            chunk = ids[i:i + INCOMPLETE_IDS_PER_REQUEST]
+            try:
+                entries = await self.get_entries_by_id(chunk)
+            except AssertionError:  # ratelimit
+                raise RateLimited(f"Wufoo rate limited {self.username} while rechecking unfinished entries")
+            fetched += len(entries)
+            names = await self.add_entries(entries, names)
+            # entries that weren't returned were deleted
+            returned = set(int(e['EntryId']) for e in entries)
+            await self.db.set_incomplete({}, done=[eid for eid in chunk if eid not in returned])
+        self.incomplete_checked = monotonic()
+        return fetched
+
+    async def pull_entries(self, full=False):
+        """Pull entries submitted since the last pull.
+        
+        Set full to re-download every entry of the form instead. 
+        Entries that were already pulled are still skipped by the db. Unfinished
+        Save & Resume entries don't hold back the mark, they're rechecked by id
+        every INCOMPLETE_RECHECK_INTERVAL instead.
+        Returns the number of entries fetched, raises RateLimited if Wufoo refused a page"""
+        after = 0 if full else self.db.high_water_mark
+        page = 0
+        fetched = 0
+        names = None
+        newest = after
+        while True:
+            try:
+                entries = await self.get_entries_page(after, page)
+            except AssertionError:  # ratelimit
+                raise RateLimited(f"Wufoo rate limited {self.username} after {fetched} entries")
+            fetched += len(entries)
+            names = await self.add_entries(entries, names)
+            newest = max([newest] + [int(entry['EntryId']) for entry in entries])
+            # pages are sorted by EntryId so progress is kept even if a later page gets ratelimited
+            if newest > self.db.high_water_mark or (full and newest != self.db.high_water_mark):
+                await self.db.set_high_water_mark(newest)
+            if len(entries) < ENTRIES_PAGE_SIZE:
+                break
+            page += 1
+        if self.db.incomplete and monotonic() - self.incomplete_checked >= INCOMPLETE_RECHECK_INTERVAL:
+            fetched += await self.recheck_incomplete()
+        return fetched
 
 
 class WufooDB:
-    def __init__(self, bot, config, guild):
+    def __init__(self, bot, config, guild, store: WufooStore):
         self.entries: dict
         self.entry_queue: dict
         self.member_map: dict
+        self.key_members: dict  # key -> {member id}, reverse of member_map
+        self.key_queue: dict  # key -> queue key, reverse of entry_queue
+        self.high_water_mark: int
+        self.incomplete: Dict[int, str]  # EntryId -> DateCreated of unfinished entries that are rechecked
         self.config = config
+        self.store = store
         self.guild = guild
         self.bot = bot
 
     @classmethod
-    async def new(cls, bot, config, guild):
-        self = cls(bot, config, guild)
-        self.entries = {k: Entry.from_dict(v, guild) for k, v in (await config.WUFOO_ENTRIES()).items()}
-        self.entry_queue = await config.WUFOO_ENTRY_QUEUE()
-        self.member_map = await config.WUFOO_MEMBER_MAP()
+    async def new(cls, bot, config, guild, store: WufooStore, settings: dict=None):
+        """`settings` can be the guild's already read config to skip reading it again"""
+        self = cls(bot, config, guild, store)
+        if settings is None:
+            settings = await config.all()
+        if settings["WUFOO_ENTRIES"] and not store.has_guild(guild.id):
+            await self.migrate_from_config(settings)
+        entries, self.entry_queue, self.member_map = store.load(guild.id)
+        self.entries = {k: Entry.from_dict(v, guild) for k, v in entries.items()}
+        self.build_indexes()
+        self.high_water_mark = settings["WUFOO_HIGH_WATER_MARK"]
+        self.incomplete = {int(eid): created for eid, created in settings["WUFOO_INCOMPLETE_ENTRIES"].items()}
         return self
+
+    async def migrate_from_config(self, settings: dict):
+        """Move entries, the queue and the member map out of Red's config and into the store"""
+        self.store.import_guild(
+            self.guild.id, settings["WUFOO_ENTRIES"], settings["WUFOO_ENTRY_QUEUE"], settings["WUFOO_MEMBER_MAP"]
+        )
+        await self.config.WUFOO_ENTRIES.clear()
+        await self.config.WUFOO_ENTRY_QUEUE.clear()
+        await self.config.WUFOO_MEMBER_MAP.clear()
+
+    def build_indexes(self):
+        self.key_queue = {k: ur for ur, k in self.entry_queue.items()}
+        self.key_members = {}
+        for mid, mentries in self.member_map.items():
+            for m in mentries:
+                self.key_members.setdefault(m['key'], set()).add(mid)
+
+    async def set_high_water_mark(self, entry_id: int):
+        self.high_water_mark = entry_id
+        await self.config.WUFOO_HIGH_WATER_MARK.set(entry_id)
+
+    async def set_incomplete(self, entries: Dict[int, str], done: Iterable[int]=()):
+        """Track unfinished entries (EntryId -> DateCreated) and stop tracking `done` ones"""
+        changed = False
+        for eid in done:
+            if self.incomplete.pop(eid, None) is not None:
+                changed = True
+        for eid, created in entries.items():
+            if self.incomplete.get(eid) != created:
+                self.incomplete[eid] = created
+                changed = True
+        if changed:
+            await self.config.WUFOO_INCOMPLETE_ENTRIES.set({str(eid): created for eid, created in self.incomplete.items()})
+
+    async def clear_incomplete(self):
+        await self.set_incomplete({}, done=list(self.incomplete))
     
     def get(self, k):
         return self.entries.get(k)
@@ -95,88 +302,160 @@ class WufooDB:
         except KeyError:
             return self.entries[self.entry_queue[queue_key_or_key]]
 
-    async def save_member_map(self):
-        await self.config.WUFOO_MEMBER_MAP.set(self.member_map)
+    async def save_member_map(self, member_id=None):
+        """Save the sent state of a member's mapped entries, or of every member's if no member is given"""
+        mids = [str(member_id)] if member_id is not None else list(self.member_map)
+        self.store.set_sent(self.guild.id, (
+            (mid, m['key'], m['sent']) for mid in mids for m in self.member_map.get(mid, [])
+        ))
     
-    async def add_to_member_map(self, k, save=True):
+    async def add_to_member_map(self, k):
         entry = self.get(k)
-        self.member_map.setdefault(str(entry.member_id), []).append({'key': k, 'sent': False})
-        if save:
-            await self.config.WUFOO_MEMBER_MAP.set(self.member_map)
+        mid = str(entry.member_id)
+        mids = self.key_members.setdefault(k, set())
+        if mid in mids:
+            return
+        mids.add(mid)
+        self.member_map.setdefault(mid, []).append({'key': k, 'sent': False})
+        self.store.put_mapping(self.guild.id, mid, k, False)
     
     async def new_entries(self, *entries, place_into_queue=False, replace_existing=False):
         new_mapped = {}
         new_queued = False
-        for entry in entries:
-            k = entry.key
-            if k in self.entries and not replace_existing:
-                continue
-            self.entries[k] = entry
-            if entry.is_linked() and not place_into_queue:
-                await self.add_to_member_map(k, save=False)
-                new_mapped.setdefault(str(entry.member_id), []).append(self.entries[k])
-            else:
-                if k in self.entry_queue.values():
+        with self.store.transaction():
+            for entry in entries:
+                k = entry.key
+                if k in self.entries and not replace_existing:
                     continue
-                ur = entry.username_raw
-                i = 2
-                while ur in self.entry_queue:
-                    ur = f"{entry.username_raw} ({i})"
-                    i += 1
-                entry.username_raw = ur
-                self.entry_queue[ur] = k
-                new_queued = True
+                self.entries[k] = entry
+                if entry.is_linked() and not place_into_queue:
+                    self.store.put_entry(self.guild.id, k, entry.to_dict())
+                    await self.add_to_member_map(k)
+                    new_mapped.setdefault(str(entry.member_id), []).append(self.entries[k])
+                else:
+                    if k in self.key_queue:
+                        self.store.put_entry(self.guild.id, k, entry.to_dict())
+                        continue
+                    ur = self.free_queue_key(entry.username_raw)
+                    entry.username_raw = ur
+                    self.entry_queue[ur] = k
+                    self.key_queue[k] = ur
+                    self.store.put_entry(self.guild.id, k, entry.to_dict())
+                    self.store.put_queue_entry(self.guild.id, ur, k)
+                    new_queued = True
         
-        await self.config.WUFOO_ENTRIES.set({k: v.to_dict() for k, v in self.entries.items()})
-        await self.config.WUFOO_ENTRY_QUEUE.set(self.entry_queue)
-        await self.config.WUFOO_MEMBER_MAP.set(self.member_map)
         if new_queued:
             self.bot.dispatch("gapps_wufoo_entry_queued", self)
         if new_mapped:
             for entries in new_mapped.values():
                 self.bot.dispatch("gapps_wufoo_entry_mapped", entries)
     
+    def free_queue_key(self, username_raw: str, taken=()):
+        """A queue key based on `username_raw` that isn't in the queue or in `taken`"""
+        ur = username_raw
+        i = 2
+        while ur in self.entry_queue or ur in taken:
+            ur = f"{username_raw} ({i})"
+            i += 1
+        return ur
+
+    def import_records(self, records: List[dict]):
+        """Bulk load records written by `export_records`, skipping entries that are already in the db.
+
+        The whole chunk is parsed first, so a malformed record raises KeyError,
+        TypeError or ValueError before anything was changed. Unlike new_entries
+        nothing is dispatched and the reverse indexes aren't kept up to date,
+        call build_indexes once everything is loaded.
+        Returns how many entries were added and how many of those were queued"""
+        entries, queue_keys, mappings = {}, {}, []
+        for record in records:
+            k = str(record['key'])
+            if k in self.entries or k in entries:
+                continue
+            if not isinstance(record['data'], dict):
+                raise TypeError(f"entry {k} isn't an object")
+            entry = Entry.from_dict(record['data'], self.guild)
+            members = record.get('members') or []
+            if not members and not record.get('queue_key') and entry.is_linked():
+                # backfilled history, don't post it to threads again
+                members = [{'member_id': str(entry.member_id), 'sent': True}]
+            mappings.extend((str(m['member_id']), k, bool(m['sent'])) for m in members)
+            if record.get('queue_key') or not members:
+                ur = self.free_queue_key(record.get('queue_key') or entry.username_raw, queue_keys)
+                entry.username_raw = ur
+                queue_keys[ur] = k
+            entries[k] = entry
+
+        with self.store.transaction():
+            self.store.put_entries(self.guild.id, [(k, entry.to_dict()) for k, entry in entries.items()])
+            self.store.put_queue_entries(self.guild.id, list(queue_keys.items()))
+            self.store.put_mappings(self.guild.id, mappings)
+        self.entries.update(entries)
+        self.entry_queue.update(queue_keys)
+        for mid, k, sent in mappings:
+            self.member_map.setdefault(mid, []).append({'key': k, 'sent': sent})
+        return len(entries), len(queue_keys)
+
+    def export_records(self, form: str=None):
+        """`form` is the hash of the form the entries came from, so an import
+        can tell whether their keys are entry ids of its own form"""
+        for k, entry in self.entries.items():
+            yield {
+                'form': form,
+                'key': k,
+                'data': entry.to_dict(),
+                'queue_key': self.key_queue.get(k),
+                'members': [
+                    {'member_id': mid, 'sent': m['sent']}
+                    for mid in sorted(self.key_members.get(k, ()))
+                    for m in self.member_map.get(mid, []) if m['key'] == k
+                ],
+            }
+
     async def remove_entries(self, qks: List[str]):
-        for k in qks[:-1]:
-            await self.pop_entry(k, save=False)
-        await self.pop_entry(qks[-1], save=True)
+        with self.store.transaction():
+            for k in qks:
+                await self.pop_entry(k)
 
-    async def pop_entry(self, queue_key, save=True):
+    async def pop_entry(self, queue_key):
         entry = self.get_queue_entry(queue_key)
         self.entry_queue.pop(entry.username_raw)
-        if save:
-            await self.config.WUFOO_ENTRY_QUEUE.set(self.entry_queue)
+        self.key_queue.pop(entry.key, None)
+        self.store.delete_queue_entry(self.guild.id, entry.username_raw)
         return entry
 
     async def link(self, queue_key, member):
-        try:
-            entry = await self.pop_entry(queue_key)
-        except KeyError:
-            entry = self.entries[queue_key]
-        entry.set_member(member)
-        await self.add_to_member_map(entry.key)
+        with self.store.transaction():
+            try:
+                entry = await self.pop_entry(queue_key)
+            except KeyError:
+                entry = self.entries[queue_key]
+            entry.set_member(member)
+            self.store.put_entry(self.guild.id, entry.key, entry.to_dict())
+            await self.add_to_member_map(entry.key)
         self.bot.dispatch("gapps_wufoo_entry_mapped", [entry])
     
     async def unlink(self, key, enqueue=False):
-        removed = None
         removed_from = []
-        for mid, mentries in self.member_map.items():
-            for i in range(len(mentries)-1,-1,-1):
-                mentry = mentries[i]
-                if mentry['key'] == key:
-                    mentries.remove(mentry)
-                    # still go through the rest to unlink all members
-                    removed = mentry
-                    member = self.guild.get_member(int(mid))
-                    if member:
-                        removed_from.append(member)
-        if removed or enqueue:
+        mids = self.key_members.pop(key, set())
+        for mid in mids:
+            mentries = self.member_map.get(mid, [])
+            mentries[:] = [m for m in mentries if m['key'] != key]
+            self.store.delete_mapping(self.guild.id, mid, key)
+            member = self.guild.get_member(int(mid))
+            if member:
+                removed_from.append(member)
+        if mids or enqueue:
             await self.new_entries(self.entries[key], place_into_queue=True, replace_existing=True)
         return removed_from
     
     async def delete_member_from_member_map(self, member: discord.Member):
-        await self.config.WUFOO_MEMBER_MAP.clear_raw(f"{member.id}")
-        del self.member_map[f"{member.id}"]
+        self.store.delete_member(self.guild.id, f"{member.id}")
+        for m in self.member_map.pop(f"{member.id}", []):
+            mids = self.key_members.get(m['key'], set())
+            mids.discard(f"{member.id}")
+            if not mids:
+                self.key_members.pop(m['key'], None)
 
 
 
@@ -184,19 +463,21 @@ class Entry:
     def __init__(self, entry_dict, guild):
         self.guild = guild
         self._dict = entry_dict
+        self._renders = {}  # highlight terms -> EntryRender
     
     @classmethod
     def from_dict(cls, entry_dict, guild):
         return cls(entry_dict, guild)
 
     @classmethod
-    def from_api(cls, api, entry, guild):
+    def from_api(cls, api, entry, guild, names: MemberNameIndex=None):
+        """Pass `names` when converting a batch of entries so members aren't searched for each one"""
         self = cls({}, guild)
         for k, v in entry.items():
             if k.startswith(('Field', 'EntryId')):
                 self[api.fields[k]] = v
         self['USERNAME_RAW'] = self[api.discord_name_field_title].strip()
-        member = guild.get_member_named(self.username)
+        member = (names or guild).get_member_named(self.username)
         self['DISCORD_MEMBER_ID'] = member.id if member else None
         self['Date Created'] = f"<t:{int(datetime.fromisoformat(entry['DateCreated']).timestamp())}:F>"
         return self
@@ -234,33 +515,15 @@ class Entry:
     def is_linked(self):
         return bool(self['DISCORD_MEMBER_ID'])
     
-    def embeds(self, highlights=[]):
-        # TODO: There's still the possibility that the highlight is split between messages, messing up the formatting
-        s = ""
-        i = 1
-        for question, answer in self.entry_items():
-            # assumes no overlaps
-            for to_find in highlights:
-                answer = re.sub(CONTAINS_PRE +
-                    re.escape(to_find) +
-                    CONTAINS_POST, 
-                    r"__**\g<word>**__",
-                    answer,
-                    flags=re.IGNORECASE)
-            if question == "Entry Id":
-                qa = f"**{question}**: {answer}"
-            else:
-                qa = f"\n\n**{int_to_emoji(i)}. {question}**\n{answer}"
-                i += 1
-            s += qa
+    def render(self, highlighter: Highlighter=None) -> "EntryRender":
+        """The entry's embeds with the highlighter's terms highlighted. Cached until the entry's answers change"""
+        highlighter = highlighter or Highlighter.for_terms(())
+        if highlighter.terms not in self._renders:
+            self._renders[highlighter.terms] = EntryRender(self, highlighter)
+        return self._renders[highlighter.terms]
 
-        first = True
-        for p in pagify(s, delims=['\n\n', '\n', ' '], priority=True, page_length=1900, escape_mass_mentions=True):
-            if first:
-                yield discord.Embed(description=p, title="Application")
-                first = False
-            else:
-                yield discord.Embed(description=p)
+    def embeds(self, highlighter: Highlighter=None):
+        return iter(self.render(highlighter).embeds)
 
     def __str__(self):
         return self.__repr__()
@@ -273,6 +536,8 @@ class Entry:
     
     def __setitem__(self, key, value):
         self._dict[key] = value
+        if key not in ('DISCORD_MEMBER_ID', 'USERNAME_RAW'):
+            self._renders.clear()
 
     def __contains__(self, key):
         return key in self._dict
@@ -296,4 +561,42 @@ class Entry:
         return (v for k, v in self.items() if k not in ('DISCORD_MEMBER_ID', 'USERNAME_RAW'))
     
     def entry_items(self):
-        return ((k, v) for k, v in self.items() if k not in ('DISCORD_MEMBER_ID', 'USERNAME_RAW'))
\ No newline at end of file
+        return ((k, v) for k, v in self.items() if k not in ('DISCORD_MEMBER_ID', 'USERNAME_RAW'))
+
+
+class EntryRender:
+    """An entry's embed pages for one set of highlight terms.
+
+    Pages are built lazily from one question/answer at a time and kept once built,
+    so resending the entry doesn't rebuild anything"""
+    def __init__(self, entry: Entry, highlighter: Highlighter):
+        self.found = set()  # highlight terms found so far
+        self.embeds = IterCache(self._embeds(entry, highlighter))
+
+    def _parts(self, entry: Entry, highlighter: Highlighter):
+        i = 1
+        for question, answer in entry.entry_items():
+            answer, found = highlighter.highlight(answer)
+            self.found |= found
+            answer = escape(answer, mass_mentions=True)
+            if question == "Entry Id":
+                yield f"**{question}**: {answer}"
+            else:
+                yield f"\n\n**{int_to_emoji(i)}. {question}**\n{answer}"
+                i += 1
+
+    def _embeds(self, entry: Entry, highlighter: Highlighter):
+        # TODO: There's still the possibility that the highlight is split between messages, messing up the formatting
+        first = True
+        for p in stream_pages(self._parts(entry, highlighter)):
+            if first:
+                yield discord.Embed(description=p, title="Application")
+                first = False
+            else:
+                yield discord.Embed(description=p)
+
+    def complete(self) -> "EntryRender":
+        """Build every page so that `found` has all of the terms"""
+        for _ in self.embeds:
+            pass
+        return self
@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime
+from time import monotonic
+from typing import Dict
+
+from .wufoo import Wufoo, RateLimited
+from .log import log
+
+
+POLL_INTERVAL = 60*60  # seconds between successful pulls of a guild's form
+POLL_TICK = 60  # seconds between checks for guilds that are due
+# Wufoo allows an account 100 API requests a day (see `[p]wufoo check`), so
+# being refused usually means the day's quota is spent. Start retrying after
+# an hour and back off to a day, when the quota has certainly reset
+BACKOFF_BASE = 60*60  # seconds
+BACKOFF_MAX = 60*60*24  # seconds
+# Each account's requests are kept to that same 100 a day on average. An hourly
+# pull of one page uses 24 of them and rechecking unfinished entries 4 per 10
+# entries, the rest is room for multi-page pulls and the check/resync commands,
+# which may use up to REQUEST_BURST at once
+DAILY_QUOTA = 100
+REQUEST_RATE = DAILY_QUOTA / (60*60*24)  # requests per second
+REQUEST_BURST = 10
+
+
+class TokenBucket:
+    def __init__(self, rate: float = REQUEST_RATE, capacity: int = REQUEST_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Take a token. A token takes about 15 minutes to come back, so rather
+        than waiting for one this raises RateLimited when the bucket is empty"""
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                raise RateLimited(f"request budget spent, next request in {int((1 - self.tokens) / self.rate)}s")
+            self.tokens -= 1
+
+
+class PollState:
+    def __init__(self):
+        self.last_attempt: datetime = None
+        self.last_success: datetime = None
+        self.last_fetched = 0
+        self.total_fetched = 0
+        self.failures = 0
+        self.last_error: str = None
+        self.next_poll = 0.0  # monotonic
+
+    @property
+    def lag(self):
+        """Seconds since the last successful pull"""
+        if self.last_success is None:
+            return None
+        return (datetime.now() - self.last_success).total_seconds()
+
+    def __str__(self):
+        if self.last_success:
+            s = f"last synced <t:{int(self.last_success.timestamp())}:R>, {self.last_fetched} entries fetched"
+        else:
+            s = "never synced"
+        s += f", {self.total_fetched} entries fetched in total"
+        if self.failures:
+            s += f", {self.failures} failed attempts in a row ({self.last_error})"
+        retry = self.next_poll - monotonic()
+        if retry > 0:
+            s += f", next pull in {int(retry)}s"
+        return s
+
+
+class WufooPoller:
+    """Pulls new entries for every guild's Wufoo form.
+
+    Guilds are polled concurrently. Requests go through a token bucket per
+    Wufoo account, sized to the account's daily quota. A guild that gets rate limited is retried with exponential backoff
+    instead of waiting for the next hourly pull."""
+    def __init__(self, apis: Dict[int, Wufoo], interval: float = POLL_INTERVAL):
+        self.apis = apis
+        self.interval = interval
+        self.buckets: Dict[str, TokenBucket] = {}  # Wufoo account -> its request budget
+        self.states: Dict[int, PollState] = {}
+        self.task: asyncio.Task = None
+
+    def state_for(self, gid: int) -> PollState:
+        return self.states.setdefault(gid, PollState())
+
+    def start(self, loop):
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self.run())
+        return self.task
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+
+    async def poll(self, gid: int, full: bool = False) -> int:
+        """Pull a guild's entries now and record the outcome. Raises RateLimited"""
+        wapi = self.apis[gid]
+        wapi.limiter = self.buckets.setdefault(wapi.username, TokenBucket())
+        state = self.state_for(gid)
+        state.last_attempt = datetime.now()
+        try:
+            fetched = await wapi.pull_entries(full=full)
+        except Exception as e:
+            state.failures += 1
+            state.last_error = "rate limited" if isinstance(e, RateLimited) else type(e).__name__
+            state.next_poll = monotonic() + min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (state.failures - 1))
+            raise
+        state.last_success = datetime.now()
+        state.last_fetched = fetched
+        state.total_fetched += fetched
+        state.failures = 0
+        state.last_error = None
+        state.next_poll = monotonic() + self.interval
+        return fetched
+
+    async def _poll_due(self, gid: int):
+        try:
+            await self.poll(gid)
+        except RateLimited:
+            log.info(f"Wufoo rate limited guild {gid}, retrying in {int(self.state_for(gid).next_poll - monotonic())}s")
+        except Exception as e:
+            log.error(f"Failed to pull Wufoo entries for guild {gid}", exc_info=e)
+
+    async def run(self):
+        while True:
+            now = monotonic()
+            due = [gid for gid in list(self.apis) if self.state_for(gid).next_poll <= now]
+            if due:
+                await asyncio.gather(*[self._poll_due(gid) for gid in due])
+            await asyncio.sleep(POLL_TICK)
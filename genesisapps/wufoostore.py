@@ -0,0 +1,145 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    guild_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (guild_id, key)
+);
+CREATE TABLE IF NOT EXISTS entry_queue (
+    guild_id INTEGER NOT NULL,
+    queue_key TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (guild_id, queue_key)
+);
+CREATE TABLE IF NOT EXISTS member_map (
+    guild_id INTEGER NOT NULL,
+    member_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    sent INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, member_id, key)
+);
+"""
+
+
+class WufooStore:
+    """SQLite storage for Wufoo entries, the unlinked entry queue and the member map.
+
+    Every entry, queue item and member mapping is its own row, so adding or
+    linking one entry only writes that row. Writes are committed right away
+    unless they're made inside `transaction`"""
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._in_transaction = False
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        if self._in_transaction:
+            yield
+            return
+        self._in_transaction = True
+        try:
+            with self.conn:
+                yield
+        finally:
+            self._in_transaction = False
+
+    def _write(self, sql: str, params=()):
+        with self.transaction():
+            self.conn.execute(sql, params)
+
+    def _write_many(self, sql: str, rows: Iterable[Tuple]):
+        with self.transaction():
+            self.conn.executemany(sql, rows)
+
+    def has_guild(self, guild_id: int) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM entries WHERE guild_id = ? LIMIT 1", (guild_id,)
+        ).fetchone()
+        return row is not None
+
+    def load(self, guild_id: int):
+        """Returns the guild's entries, entry queue and member map as dicts"""
+        entries = {
+            key: json.loads(data) for key, data in self.conn.execute(
+                "SELECT key, data FROM entries WHERE guild_id = ? ORDER BY rowid", (guild_id,)
+            )
+        }
+        entry_queue = {
+            queue_key: key for queue_key, key in self.conn.execute(
+                "SELECT queue_key, key FROM entry_queue WHERE guild_id = ? ORDER BY rowid", (guild_id,)
+            )
+        }
+        member_map = {}
+        for member_id, key, sent in self.conn.execute(
+            "SELECT member_id, key, sent FROM member_map WHERE guild_id = ? ORDER BY rowid", (guild_id,)
+        ):
+            member_map.setdefault(member_id, []).append({'key': key, 'sent': bool(sent)})
+        return entries, entry_queue, member_map
+
+    def put_entries(self, guild_id: int, entries: Iterable[Tuple[str, dict]]):
+        self._write_many(
+            "INSERT OR REPLACE INTO entries (guild_id, key, data) VALUES (?, ?, ?)",
+            ((guild_id, key, json.dumps(data)) for key, data in entries)
+        )
+
+    def put_entry(self, guild_id: int, key: str, data: dict):
+        self.put_entries(guild_id, [(key, data)])
+
+    def put_queue_entries(self, guild_id: int, queue: Iterable[Tuple[str, str]]):
+        self._write_many(
+            "INSERT OR REPLACE INTO entry_queue (guild_id, queue_key, key) VALUES (?, ?, ?)",
+            ((guild_id, queue_key, key) for queue_key, key in queue)
+        )
+
+    def put_queue_entry(self, guild_id: int, queue_key: str, key: str):
+        self.put_queue_entries(guild_id, [(queue_key, key)])
+
+    def delete_queue_entry(self, guild_id: int, queue_key: str):
+        self._write("DELETE FROM entry_queue WHERE guild_id = ? AND queue_key = ?", (guild_id, queue_key))
+
+    def put_mappings(self, guild_id: int, mappings: Iterable[Tuple[str, str, bool]]):
+        self._write_many(
+            "INSERT OR REPLACE INTO member_map (guild_id, member_id, key, sent) VALUES (?, ?, ?, ?)",
+            ((guild_id, member_id, key, int(sent)) for member_id, key, sent in mappings)
+        )
+
+    def put_mapping(self, guild_id: int, member_id: str, key: str, sent: bool):
+        self.put_mappings(guild_id, [(member_id, key, sent)])
+
+    def set_sent(self, guild_id: int, mappings: Iterable[Tuple[str, str, bool]]):
+        self._write_many(
+            "UPDATE member_map SET sent = ? WHERE guild_id = ? AND member_id = ? AND key = ?",
+            ((int(sent), guild_id, member_id, key) for member_id, key, sent in mappings)
+        )
+
+    def delete_mapping(self, guild_id: int, member_id: str, key: str):
+        self._write(
+            "DELETE FROM member_map WHERE guild_id = ? AND member_id = ? AND key = ?",
+            (guild_id, member_id, key)
+        )
+
+    def delete_member(self, guild_id: int, member_id: str):
+        self._write("DELETE FROM member_map WHERE guild_id = ? AND member_id = ?", (guild_id, member_id))
+
+    def import_guild(self, guild_id: int, entries: dict, entry_queue: dict, member_map: dict):
+        """Bulk load a guild's data in one transaction. Used to migrate data out of Red's config"""
+        with self.transaction():
+            self.put_entries(guild_id, entries.items())
+            self.put_queue_entries(guild_id, entry_queue.items())
+            self.put_mappings(guild_id, (
+                (member_id, m['key'], m['sent'])
+                for member_id, mentries in member_map.items() for m in mentries
+            ))